@@ -0,0 +1,14 @@
+"""
+Chunking worker for ingest's process pool.
+Kept free of import-time side effects so spawned workers start quickly.
+"""
+from functools import lru_cache
+from llama_index.core.node_parser import SentenceSplitter
+
+@lru_cache(maxsize=1)
+def _splitter():
+    return SentenceSplitter()
+
+def chunk_documents(documents):
+    """Splits documents into nodes with a per-process SentenceSplitter."""
+    return _splitter().get_nodes_from_documents(documents)
@@ -8,7 +8,11 @@ BASE_DIR = Path(__file__).resolve().parent
 
 # Load environment variables from the root .env file
 # This assumes the .env is in the project root (one level up from backend/)
-load_dotenv(BASE_DIR.parent / ".env")
+# Child processes (ingest's spawn workers) inherit the loaded values, so only the first import parses it
+_FIRST_LOAD = os.environ.get("CORTEX_DOTENV_LOADED") != "1"
+if _FIRST_LOAD:
+    load_dotenv(BASE_DIR.parent / ".env")
+    os.environ["CORTEX_DOTENV_LOADED"] = "1"
 
 # --- Path Management ---
 # DATA_ROOT is the base directory for all stored data (ChromaDB, registry, etc.)
@@ -18,9 +22,44 @@ DATA_ROOT = os.getenv("CORTEX_DATA_ROOT", str(BASE_DIR))
 # ChromaDB storage path
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", os.path.join(DATA_ROOT, "chroma_db"))
 
+# Optional chroma server (`chroma run --path <CHROMA_DB_PATH>`); queries use CHROMA_DB_PATH directly when unset
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+
 # Base directory for temporary clones
 TEMP_BASE_DIR = os.getenv("TEMP_BASE_DIR", os.path.join(DATA_ROOT, "temp_repos"))
 
+# SQLite cache of chunk embeddings, keyed by content hash and model
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(DATA_ROOT, "embed_cache.sqlite3"))
+
+# Jaccard threshold for reusing a near-duplicate chunk's embedding (0 disables)
+SEMANTIC_CACHE_TAU = float(os.getenv("CORTEX_SEMANTIC_CACHE_TAU", "0.95"))
+
+# Jaccard threshold for answering a near-repeat question with a cached query embedding (0 disables)
+QUERY_CACHE_TAU = float(os.getenv("CORTEX_QUERY_CACHE_TAU", "0.9"))
+
+# Set to "0" to always call the LLM instead of reusing the answer to an exact repeat question
+RESPONSE_CACHE = os.getenv("CORTEX_CACHE", "1") != "0"
+
+# Set to "1" to retrieve with HyDE: an LLM-drafted hypothetical answer is embedded alongside the question
+HYDE = os.getenv("CORTEX_HYDE", "0") == "1"
+
+# Workers used to read files during repo ingestion; more processes than cores only add startup cost
+INGEST_WORKERS = min(int(os.getenv("CORTEX_INGEST_WORKERS", "4")), os.cpu_count() or 1)
+
+# Below this many files, spawning loader processes costs more than it saves
+PARALLEL_LOAD_MIN_FILES = int(os.getenv("CORTEX_PARALLEL_LOAD_MIN_FILES", "200"))
+
+# Gemini embedding requests per minute allowed during ingest; match your project's quota
+EMBED_RPM = int(os.getenv("CORTEX_EMBED_RPM", "1500"))
+
+# HNSW build parameters for newly created collections, tuned for bulk ingest.
+# Chroma fixes these at creation time: existing collections keep their original values.
+HNSW_CONSTRUCTION_EF = int(os.getenv("CORTEX_HNSW_CONSTRUCTION_EF", "64"))
+HNSW_M = int(os.getenv("CORTEX_HNSW_M", "12"))
+HNSW_SEARCH_EF = int(os.getenv("CORTEX_HNSW_SEARCH_EF", "64"))
+HNSW_SYNC_THRESHOLD = int(os.getenv("CORTEX_HNSW_SYNC_THRESHOLD", "10000"))
+
 # Registry file for repo-to-context mapping
 REGISTRY_FILE = os.getenv("REGISTRY_FILE", os.path.join(DATA_ROOT, "repo_registry.json"))
 
@@ -45,6 +84,7 @@ def get_unique_temp_dir() -> str:
     os.makedirs(path, exist_ok=True)
     return path
 
-if not GEMINI_API_KEY:
+# Warned once, by the process that loaded the environment, not again by each worker
+if not GEMINI_API_KEY and _FIRST_LOAD:
     import logging
     logging.warning("GEMINI_API_KEY not found in environment variables. Gemini features will fail.")
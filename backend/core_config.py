@@ -22,6 +22,10 @@ class CoreTexSettings(BaseSettings):
     DATA_ROOT: Path = Path(os.getenv("CORETEX_DATA_ROOT", str(BASE_DIR / "vault")))
     CHROMA_PATH: str = str(DATA_ROOT / "vector_tier")
     SQL_PATH: str = f"sqlite:///{DATA_ROOT}/registry.sqlite"
+    EMBED_CACHE_PATH: str = str(DATA_ROOT / "embed_cache.sqlite3")
+    INGEST_WORKERS: int = min(int(os.getenv("CORTEX_INGEST_WORKERS", "4")), os.cpu_count() or 1)
+    PARALLEL_LOAD_MIN_FILES: int = int(os.getenv("CORTEX_PARALLEL_LOAD_MIN_FILES", "200"))
+    SEMANTIC_CACHE_TAU: float = float(os.getenv("CORTEX_SEMANTIC_CACHE_TAU", "0.95"))
     
     # Model Orchestration (Gemini 3.1 Pro)
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
@@ -32,6 +36,9 @@ class CoreTexSettings(BaseSettings):
     # Thinking Modes: 'low', 'medium', 'high'
     THINKING_MODE: str = os.getenv("CORETEX_THINKING", "medium")
 
+    # Build chat engines for every tier at startup instead of on first /chat
+    WARM_AT_STARTUP: bool = os.getenv("CORTEX_WARM_AT_STARTUP", "0") == "1"
+
     # Security Gateway
     CORETEX_API_KEY: str = os.getenv("CORETEX_API_KEY", "treelight-innovation-secure-vault")
 
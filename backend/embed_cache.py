@@ -0,0 +1,446 @@
+"""
+Persistent embedding cache.
+Maps (sha256(text), model) to float32 vectors so unchanged chunks are not re-embedded on re-ingest.
+A second, MinHash-based tier reuses vectors for near-duplicate chunks (whitespace, comments, renames).
+Query embeddings get a separate in-memory LRU, keyed by normalized question text, with the same
+MinHash tier for near-repeat questions; it is written through to SQLite and reloaded on startup.
+"""
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, mean_agg
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
+
+# Stay well under SQLite's bound-parameter limit for the IN (...) lookup
+_LOOKUP_CHUNK = 900
+
+# MinHash / LSH layout: 64 permutations split into 16 bands of 4 rows
+_MINHASH_PERMS = 64
+_MINHASH_BANDS = 16
+# Fixed seed: signatures are persisted, so permutations must be stable across runs
+_rng = np.random.default_rng(0x5EED)
+_MINHASH_A = _rng.integers(1, 2**63, size=_MINHASH_PERMS, dtype=np.uint64) | np.uint64(1)
+_MINHASH_B = _rng.integers(0, 2**63, size=_MINHASH_PERMS, dtype=np.uint64)
+
+# Texts longer than this skip the near-duplicate tier to bound MinHash cost
+SEMANTIC_MAX_CHARS = 4096
+
+# Query vectors held in memory per CachingEmbedding
+QUERY_CACHE_SIZE = 4096
+
+# Persisted query vectors older than this are pruned
+QUERY_CACHE_TTL = 30 * 24 * 3600
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+_WORD_RE = re.compile(r"\w+")
+
+def has_words(text: str) -> bool:
+    """False for text without word tokens, whose MinHash is the same constant for all such text."""
+    return _WORD_RE.search(text) is not None
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash over word 3-grams of the lowercased text; whitespace differences are ignored."""
+    tokens = _WORD_RE.findall(text.lower())
+    shingles = {" ".join(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2))}
+    base = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # uint64 arithmetic wraps, which is what the multiply-add hash family wants
+    return (base[:, None] * _MINHASH_A + _MINHASH_B).min(axis=0)
+
+def _band_keys(sig: np.ndarray) -> List[bytes]:
+    rows = sig.reshape(_MINHASH_BANDS, -1)
+    return [
+        hashlib.blake2b(bytes([b]) + rows[b].tobytes(), digest_size=8).digest()
+        for b in range(_MINHASH_BANDS)
+    ]
+
+class EmbeddingCache:
+    """SQLite store of embedding vectors keyed by content hash and model name."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "hash BLOB NOT NULL, model TEXT NOT NULL, vec BLOB NOT NULL, "
+                "PRIMARY KEY (hash, model))"
+            )
+            # Near-duplicate tier: cluster representatives, their LSH bands, and members
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS clusters ("
+                "id INTEGER PRIMARY KEY, model TEXT NOT NULL, sig BLOB NOT NULL, vec BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cluster_bands ("
+                "band BLOB NOT NULL, model TEXT NOT NULL, cluster_id INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS cluster_bands_lookup ON cluster_bands (band, model)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cluster_members ("
+                "hash BLOB NOT NULL, model TEXT NOT NULL, cluster_id INTEGER NOT NULL, "
+                "PRIMARY KEY (hash, model))"
+            )
+            # Query vectors, keyed by sha1 of the normalized question
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS queries ("
+                "key BLOB NOT NULL, model TEXT NOT NULL, sig BLOB NOT NULL, vec BLOB NOT NULL, "
+                "created REAL NOT NULL, PRIMARY KEY (key, model))"
+            )
+
+    def get_many(self, hashes: List[bytes], model: str) -> Dict[bytes, np.ndarray]:
+        """Returns the cached vectors for whichever of `hashes` are present."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), _LOOKUP_CHUNK):
+                chunk = hashes[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM cache WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for h, vec in rows:
+                    found[bytes(h)] = np.frombuffer(vec, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray], model: str):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (hash, model, vec) VALUES (?, ?, ?)",
+                [(h, model, vec.tobytes()) for h, vec in items.items()],
+            )
+
+    def find_cluster(self, sig: np.ndarray, model: str, tau: float):
+        """Returns (cluster_id, vec) of the closest cluster sharing an LSH band, if its Jaccard estimate >= tau."""
+        bands = _band_keys(sig)
+        placeholders = ",".join("?" * len(bands))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, sig, vec FROM clusters WHERE model = ? AND id IN ("
+                f"SELECT cluster_id FROM cluster_bands WHERE model = ? AND band IN ({placeholders}))",
+                [model, model, *bands],
+            ).fetchall()
+        best = None
+        for cluster_id, other, vec in rows:
+            score = float(np.mean(sig == np.frombuffer(other, dtype=np.uint64)))
+            if score >= tau and (best is None or score > best[0]):
+                best = (score, cluster_id, vec)
+        if best is None:
+            return None
+        return best[1], np.frombuffer(best[2], dtype=np.float32)
+
+    def add_clusters(self, items: List[tuple], model: str):
+        """Registers (hash, sig, vec) triples as new single-member clusters."""
+        with self._lock, self._conn:
+            for h, sig, vec in items:
+                cluster_id = self._conn.execute(
+                    "INSERT INTO clusters (model, sig, vec) VALUES (?, ?, ?)",
+                    (model, sig.tobytes(), vec.tobytes()),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO cluster_bands (band, model, cluster_id) VALUES (?, ?, ?)",
+                    [(band, model, cluster_id) for band in _band_keys(sig)],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cluster_members (hash, model, cluster_id) VALUES (?, ?, ?)",
+                    (h, model, cluster_id),
+                )
+
+    def add_members(self, items: Dict[bytes, int], model: str):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cluster_members (hash, model, cluster_id) VALUES (?, ?, ?)",
+                [(h, model, cluster_id) for h, cluster_id in items.items()],
+            )
+
+    def load_queries(self, model: str, limit: int, max_age: float):
+        """Prunes expired queries; returns up to `limit` of the newest as (key, sig, vec), oldest first."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM queries WHERE created < ?", (time.time() - max_age,))
+            rows = self._conn.execute(
+                "SELECT key, sig, vec FROM queries WHERE model = ? ORDER BY created DESC LIMIT ?",
+                (model, limit),
+            ).fetchall()
+        return [
+            (bytes(key), np.frombuffer(sig, dtype=np.uint64), np.frombuffer(vec, dtype=np.float32))
+            for key, sig, vec in reversed(rows)
+        ]
+
+    def put_queries(self, items: List[Tuple[bytes, np.ndarray, np.ndarray]], model: str):
+        """Stores (key, sig, vec) rows as returned by QueryCache.put."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO queries (key, model, sig, vec, created) VALUES (?, ?, ?, ?, ?)",
+                [(key, model, sig.tobytes(), vec.tobytes(), now) for key, sig, vec in items],
+            )
+
+class QueryCache:
+    """
+    In-memory LRU of query vectors keyed by normalized text, with an LSH index for near-repeats.
+    Vectors and signatures live in preallocated float32/uint64 matrices (one row per entry),
+    allocated on first insert once the embedding width is known; evicted rows are reused.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        # sha1(normalized query) -> row in _vecs/_sigs, in LRU order
+        self._rows: "OrderedDict[bytes, int]" = OrderedDict()
+        self._vecs: Optional[np.ndarray] = None
+        self._sigs = np.empty((maxsize, _MINHASH_PERMS), dtype=np.uint64)
+        self._bands: Dict[bytes, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, query: str, tau: float = 0.0) -> Optional[np.ndarray]:
+        """Exact (normalized) hit first; then, if tau > 0, the closest cached query with Jaccard >= tau."""
+        text = normalize_query(query)
+        key = hashlib.sha1(text.encode("utf-8")).digest()
+        with self._lock:
+            if key not in self._rows:
+                if tau <= 0 or not self._rows or not has_words(text):
+                    return None
+                sig = minhash_signature(text)
+                candidates = set()
+                for band in _band_keys(sig):
+                    candidates |= self._bands.get(band, set())
+                if not candidates:
+                    return None
+                keys = list(candidates)
+                scores = (self._sigs[[self._rows[k] for k in keys]] == sig).mean(axis=1)
+                best = int(np.argmax(scores))
+                if scores[best] < tau:
+                    return None
+                key = keys[best]
+            self._rows.move_to_end(key)
+            # A copy: the row may be reused once this entry is evicted
+            return self._vecs[self._rows[key]].copy()
+
+    def put(self, query: str, vec):
+        """Caches `vec` for `query`; returns the (key, sig, vec) entry that was stored."""
+        text = normalize_query(query)
+        key = hashlib.sha1(text.encode("utf-8")).digest()
+        sig = minhash_signature(text)
+        vec = np.asarray(vec, dtype=np.float32)
+        self.add(key, sig, vec)
+        return key, sig, vec
+
+    def add(self, key: bytes, sig: np.ndarray, vec: np.ndarray):
+        with self._lock:
+            if self._vecs is None:
+                self._vecs = np.empty((self.maxsize, len(vec)), dtype=np.float32)
+            if key in self._rows:
+                row = self._rows[key]
+                self._unindex(key, row)
+                self._rows.move_to_end(key)
+            elif len(self._rows) < self.maxsize:
+                row = len(self._rows)
+                self._rows[key] = row
+            else:
+                old_key, row = self._rows.popitem(last=False)
+                self._unindex(old_key, row)
+                self._rows[key] = row
+            self._vecs[row] = vec
+            self._sigs[row] = sig
+            for band in _band_keys(sig):
+                self._bands.setdefault(band, set()).add(key)
+
+    def _unindex(self, key: bytes, row: int):
+        for band in _band_keys(self._sigs[row]):
+            members = self._bands.get(band)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._bands[band]
+
+class CachingEmbedding(BaseEmbedding):
+    """
+    Wraps another embedding model with an EmbeddingCache.
+    Text embeddings are looked up by content hash first, then (if semantic_tau > 0) by
+    MinHash similarity; only misses reach the wrapped model.
+    Query embeddings are cached by normalized text and (if query_tau > 0) by MinHash
+    similarity to earlier questions; recent ones are reloaded from disk on startup.
+    """
+    embed_model: BaseEmbedding = Field(description="Embedding model used for cache misses.")
+    semantic_tau: float = Field(
+        default=0.0, description="Jaccard threshold for reusing a near-duplicate's vector; 0 disables."
+    )
+    query_tau: float = Field(
+        default=0.0, description="Jaccard threshold for reusing a near-repeat query's vector; 0 disables."
+    )
+    _cache: EmbeddingCache = PrivateAttr()
+    _queries: QueryCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache_path: str, **kwargs):
+        super().__init__(
+            embed_model=embed_model,
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._cache = EmbeddingCache(cache_path)
+        self._queries = QueryCache()
+        for key, sig, vec in self._cache.load_queries(self.model_name, QUERY_CACHE_SIZE, QUERY_CACHE_TTL):
+            self._queries.add(key, sig, vec)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachingEmbedding"
+
+    def _lookup(self, texts: List[str]):
+        """
+        Returns per-text hashes, the cached vectors, the index of the first text for each miss,
+        and the MinHash signatures of misses that should seed new clusters.
+        """
+        hashes = [text_hash(t) for t in texts]
+        found = self._cache.get_many(list(set(hashes)), self.model_name)
+        missing, seen = [], set()
+        for i, h in enumerate(hashes):
+            if h not in found and h not in seen:
+                seen.add(h)
+                missing.append(i)
+
+        sigs = {}
+        if missing and self.semantic_tau > 0:
+            missing, sigs = self._semantic_lookup(texts, hashes, found, missing)
+        return hashes, found, missing, sigs
+
+    def _semantic_lookup(self, texts, hashes, found, missing):
+        """Resolves exact-cache misses against near-duplicate clusters; returns the remaining misses."""
+        remaining, sigs, reused, members = [], {}, {}, {}
+        for i in missing:
+            if len(texts[i]) >= SEMANTIC_MAX_CHARS or not has_words(texts[i]):
+                remaining.append(i)
+                continue
+            sig = minhash_signature(texts[i])
+            hit = self._cache.find_cluster(sig, self.model_name, self.semantic_tau)
+            if hit is None:
+                sigs[i] = sig
+                remaining.append(i)
+            else:
+                members[hashes[i]], reused[hashes[i]] = hit
+        if reused:
+            self._cache.put_many(reused, self.model_name)
+            self._cache.add_members(members, self.model_name)
+            found.update(reused)
+        return remaining, sigs
+
+    def _store(self, hashes, found, missing, sigs, fresh):
+        new = {hashes[i]: np.asarray(vec, dtype=np.float32) for i, vec in zip(missing, fresh)}
+        self._cache.put_many(new, self.model_name)
+        if sigs:
+            self._cache.add_clusters(
+                [(hashes[i], sig, new[hashes[i]]) for i, sig in sigs.items()], self.model_name
+            )
+        found.update(new)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing, sigs = self._lookup(texts)
+        if missing:
+            fresh = self.embed_model.get_text_embedding_batch([texts[i] for i in missing])
+            self._store(hashes, found, missing, sigs, fresh)
+        return [found[h].tolist() for h in hashes]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # Cache reads, MinHash and writes are blocking SQLite/numpy work; keep them off the loop
+        hashes, found, missing, sigs = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            fresh = await self.embed_model.aget_text_embedding_batch([texts[i] for i in missing])
+            await asyncio.to_thread(self._store, hashes, found, missing, sigs, fresh)
+        return [found[h].tolist() for h in hashes]
+
+    # Resolve whole batches against the cache in one pass; the wrapped model
+    # does its own batching for the misses.
+    def get_text_embedding_batch(self, texts: List[str], show_progress: bool = False, **kwargs) -> List[List[float]]:
+        return self._get_text_embeddings(texts)
+
+    async def aget_text_embedding_batch(self, texts: List[str], show_progress: bool = False) -> List[List[float]]:
+        return await self._aget_text_embeddings(texts)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _query_batches(self, queries: List[str]):
+        return [queries[i:i + self.embed_batch_size] for i in range(0, len(queries), self.embed_batch_size)]
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        # Gemini embeds a list of queries in one request; other models go one at a time
+        if isinstance(self.embed_model, GoogleGenAIEmbedding):
+            return [
+                vec for batch in self._query_batches(queries)
+                for vec in self.embed_model._embed_texts(batch, task_type="RETRIEVAL_QUERY")
+            ]
+        return [self.embed_model.get_query_embedding(q) for q in queries]
+
+    async def _aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        if isinstance(self.embed_model, GoogleGenAIEmbedding):
+            return [
+                vec for batch in self._query_batches(queries)
+                for vec in await self.embed_model._aembed_texts(batch, task_type="RETRIEVAL_QUERY")
+            ]
+        return [await self.embed_model.aget_query_embedding(q) for q in queries]
+
+    def _split_queries(self, queries: List[str]):
+        """Returns per-query cached vectors (None on a miss) and the distinct missed queries."""
+        hits = [self._queries.get(q, self.query_tau) for q in queries]
+        missing = list(dict.fromkeys(q for q, hit in zip(queries, hits) if hit is None))
+        return hits, missing
+
+    def _merge_queries(self, queries, hits, missing, fresh):
+        """Caches the fresh vectors in memory; returns every query's vector and the rows to persist."""
+        fresh = dict(zip(missing, fresh))
+        rows = [self._queries.put(q, vec) for q, vec in fresh.items()]
+        return [fresh[q] if hit is None else hit.tolist() for q, hit in zip(queries, hits)], rows
+
+    def _get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        hits, missing = self._split_queries(queries)
+        fresh = self._embed_queries(missing) if missing else []
+        vectors, rows = self._merge_queries(queries, hits, missing, fresh)
+        if rows:
+            self._cache.put_queries(rows, self.model_name)
+        return vectors
+
+    async def _aget_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        hits, missing = self._split_queries(queries)
+        fresh = await self._aembed_queries(missing) if missing else []
+        vectors, rows = self._merge_queries(queries, hits, missing, fresh)
+        if rows:
+            # The SQLite write-through stays off the event loop
+            await asyncio.to_thread(self._cache.put_queries, rows, self.model_name)
+        return vectors
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embeddings([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._aget_query_embeddings([query]))[0]
+
+    # Multi-query retrieval (e.g. HyDE: hypothetical answer + original question) embeds
+    # every uncached query in one request instead of one request per query.
+    def get_agg_embedding_from_queries(self, queries: List[str], agg_fn: Optional[Callable] = None) -> List[float]:
+        return (agg_fn or mean_agg)(self._get_query_embeddings(queries))
+
+    async def aget_agg_embedding_from_queries(
+        self, queries: List[str], agg_fn: Optional[Callable] = None
+    ) -> List[float]:
+        return (agg_fn or mean_agg)(await self._aget_query_embeddings(queries))
@@ -0,0 +1,23 @@
+"""
+Per-file metadata hook for SimpleDirectoryReader.
+Attaches provenance while files are loaded, so there is no second pass over the documents.
+A module-level class rather than a closure so worker processes can unpickle it.
+"""
+import os
+from llama_index.core.readers.file.base import default_file_metadata_func
+
+class FileMetadata:
+    """
+    Reader `file_metadata` callable: the reader's default file metadata plus a shared `extra` dict.
+    With `root` set, file_path is stored relative to it for cleaner display.
+    """
+
+    def __init__(self, extra: dict, root: str = None):
+        self.extra = extra
+        self.root = root
+
+    def __call__(self, file_path: str) -> dict:
+        metadata = {**default_file_metadata_func(file_path), **self.extra}
+        if self.root:
+            metadata["file_path"] = os.path.relpath(file_path, self.root)
+        return metadata
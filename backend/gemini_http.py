@@ -0,0 +1,108 @@
+"""
+Shared, pooled HTTP transport for google-genai clients.
+Models built with the same API key and options share one genai.Client, so the LLM and the
+embedding model reuse the same kept-alive TLS connections between chat turns and embedding
+batches. Sync requests go through one process-wide httpx client (HTTP/2 when the optional h2
+package is installed). Async requests use the SDK's aiohttp sessions, which it keeps per event
+loop: a pooled async client would outlive the asyncio.run() that opened its connections.
+"""
+import importlib.util
+from functools import lru_cache
+
+import httpx
+from google import genai
+from google.genai import types
+
+# HTTP/2 only when the optional h2 package is installed; otherwise pooled HTTP/1.1
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Idle connections survive the pauses between chat turns, so a turn rarely pays a new handshake
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=300)
+
+# Retries of failed connection attempts only; HTTP-level retries stay with the SDK's retry_options
+CONNECT_RETRIES = 2
+
+# Dropped connections, resets and timeouts from either transport; worth retrying as-is
+try:
+    import aiohttp
+    _AIOHTTP_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+except ImportError:
+    _AIOHTTP_ERRORS = ()
+TRANSIENT_ERRORS = (httpx.TransportError, TimeoutError, *_AIOHTTP_ERRORS)
+
+@lru_cache(maxsize=1)
+def shared_http_client() -> httpx.Client:
+    """Returns the process-wide sync httpx.Client."""
+    return httpx.Client(
+        transport=httpx.HTTPTransport(http2=HTTP2, limits=POOL_LIMITS, retries=CONNECT_RETRIES)
+    )
+
+@lru_cache(maxsize=None)
+def _genai_client(api_key: str, options_json: str) -> genai.Client:
+    options = types.HttpOptions.model_validate_json(options_json).model_copy(
+        update={"httpx_client": shared_http_client()}
+    )
+    return genai.Client(api_key=api_key, http_options=options)
+
+def pooled_genai_client(api_key: str, http_options: types.HttpOptions = None) -> genai.Client:
+    """Returns the genai.Client shared by every caller with the same key and options."""
+    return _genai_client(api_key, (http_options or types.HttpOptions()).model_dump_json(exclude_none=True))
+
+def use_pooled_client(model, api_key: str, http_options: types.HttpOptions = None):
+    """
+    Points a llama-index GoogleGenAI or GoogleGenAIEmbedding at the shared pooled client.
+    Their constructors serialize http_options, which cannot carry httpx clients, so the
+    genai.Client is swapped in afterwards. Returns the model.
+    """
+    model._client = pooled_genai_client(api_key, http_options)
+    return model
+
+def is_transient_error(error: Exception) -> bool:
+    """True for transport failures (not HTTP error responses) that a retry may get past."""
+    return isinstance(error, TRANSIENT_ERRORS)
+
+def retry_after_seconds(error: Exception):
+    """
+    Seconds the API asked us to wait before retrying, or None if it did not say.
+    Checks the Retry-After header, then the RetryInfo detail Gemini puts in 429 bodies ("12.5s").
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    body = getattr(error, "details", None)
+    details = body.get("error", {}).get("details", []) if isinstance(body, dict) else []
+    for detail in details:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return float(delay[:-1])
+            except ValueError:
+                pass
+    return None
+
+def use_fast_json() -> bool:
+    """
+    Parses Gemini responses, including every streamed chunk, with orjson when it is installed.
+    Patches only the SDK's single response-parsing hook; json.loads elsewhere is untouched.
+    Returns whether the fast path is active.
+    """
+    if importlib.util.find_spec("orjson") is None:
+        return False
+    import orjson
+    from google.genai import _api_client, errors
+
+    if not hasattr(_api_client.HttpResponse, "_load_json_from_response"):
+        return False
+
+    def _load_json_from_response(cls, response):
+        try:
+            return orjson.loads(response)
+        except orjson.JSONDecodeError as e:
+            raise errors.UnknownApiResponseError(
+                f"Failed to parse response as JSON. Raw response: {response}"
+            ) from e
+
+    _api_client.HttpResponse._load_json_from_response = classmethod(_load_json_from_response)
+    return True
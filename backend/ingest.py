@@ -1,19 +1,212 @@
 import os
+import re
+import sys
+import time
+import hashlib
 import shutil
 import git
 import stat
+import httpx
+import asyncio
+import tarfile
+import tempfile
+import multiprocessing
 import chromadb
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from functools import lru_cache, partial
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
+from typing import List
 from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, StorageContext, Settings, Document
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
 from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
+from llama_index.embeddings.google_genai.base import is_retryable_error
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
 # Centralized configuration
-from config import CHROMA_DB_PATH, GEMINI_API_KEY, EMBED_MODEL, get_unique_temp_dir
+from config import (
+    CHROMA_DB_PATH, GEMINI_API_KEY, EMBED_MODEL, EMBED_CACHE_PATH, SEMANTIC_CACHE_TAU,
+    INGEST_WORKERS, PARALLEL_LOAD_MIN_FILES, EMBED_RPM,
+    HNSW_CONSTRUCTION_EF, HNSW_M, HNSW_SEARCH_EF, HNSW_SYNC_THRESHOLD,
+    get_unique_temp_dir
+)
+from chunking import chunk_documents
+from embed_cache import CachingEmbedding
+from file_metadata import FileMetadata
+from gemini_http import HTTP2, is_transient_error, pooled_genai_client, retry_after_seconds
+
+# Matches https://github.com/<owner>/<repo>[.git][/]
+GITHUB_URL_RE = re.compile(r"^https?://(?:www\.)?github\.com/([^/]+)/([^/]+?)(?:\.git)?/?$")
+
+# Archives larger than this spill from memory to disk while downloading
+TARBALL_SPOOL_BYTES = 64 * 1024 * 1024
+
+# Source files picked up from a repository
+REPO_EXTS = frozenset({".py", ".js", ".ts", ".html", ".css", ".md", ".json", ".txt", ".java", ".cpp"})
+
+# Directories whose whole subtree is skipped during the walk
+PRUNE_DIRS = frozenset({".git", "node_modules", "__pycache__", "dist", "build", ".venv"})
+
+# Larger files are almost always minified bundles or generated data
+MAX_FILE_BYTES = 1_000_000
+
+# Applied when a collection is created; ignored for existing ones.
+# Cosine over unit-length vectors (see upsert_nodes) is a plain inner product in HNSW.
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": HNSW_CONSTRUCTION_EF,
+    "hnsw:M": HNSW_M,
+    "hnsw:search_ef": HNSW_SEARCH_EF,
+    "hnsw:sync_threshold": HNSW_SYNC_THRESHOLD,
+}
+
+# Below this many files, chunking stays in-process; the pool's startup costs more
+PARALLEL_CHUNK_MIN_FILES = 50
+
+# Documents per chunking task submitted to the pool
+CHUNK_TASK_DOCS = 16
+
+# Files read per step of the streaming pipeline
+LOAD_SLICE_FILES = 64
+
+# Embedding batches in flight during streaming ingest
+EMBED_CONCURRENCY = 5
+
+# Chunks per Chroma upsert; large batches amortize Chroma's per-call overhead.
+# Kept under Chroma's SQLite cap of 5461 records per call.
+UPSERT_BATCH_SIZE = 5000
+
+# Gemini accepts up to 100 texts per embedding request
+EMBED_BATCH_SIZE = 100
+
+# Nodes per streaming embed batch, repeats included; bounds a batch when most chunks are duplicates
+EMBED_BATCH_MAX_NODES = 10 * EMBED_BATCH_SIZE
+
+class ConcurrentGoogleGenAIEmbedding(GoogleGenAIEmbedding):
+    """
+    Gemini embedding model that keeps several batches in flight at once, within the API quota.
+    Requests are paced by a requests-per-minute limiter. The batch size adapts AIMD-style:
+    it halves on a 429 (after honouring Retry-After) and grows back after a run of successes.
+    Dropped connections and timeouts are retried like 5xx responses. The async batch path
+    returns embeddings in input order and stops every worker as soon as one batch fails.
+    """
+    max_concurrent_batches: int = Field(
+        default=5, description="Maximum number of embedding batches in flight."
+    )
+    requests_per_minute: int = Field(
+        default=1500, description="Embedding requests allowed per minute."
+    )
+    min_batch_size: int = Field(default=16, description="Floor for the adaptive batch size.")
+    max_batch_size: int = Field(default=100, description="Ceiling for the adaptive batch size.")
+    grow_after: int = Field(
+        default=10, description="Consecutive successful requests before the batch size grows."
+    )
+    max_attempts: int = Field(default=6, description="Attempts per batch before giving up.")
+    _next_slot: float = PrivateAttr(default=0.0)
+    _streak: int = PrivateAttr(default=0)
+
+    def __init__(self, **kwargs):
+        # Retries are handled here (with Retry-After and batch shrinking), not by
+        # the parent's blind exponential backoff
+        super().__init__(**{**kwargs, "retries": 1})
+        # The parent serializes http_options to JSON, which cannot carry live httpx clients,
+        # so swap in an SDK client that shares the process-wide keep-alive pool
+        self._client = pooled_genai_client(kwargs.get("api_key"))
+
+    def _reserve_slot(self) -> float:
+        """Claims the next request slot; returns how many seconds to wait before using it."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 60.0 / self.requests_per_minute
+        return slot - now
+
+    def _on_success(self):
+        self._streak += 1
+        if self._streak >= self.grow_after and self.embed_batch_size < self.max_batch_size:
+            self._streak = 0
+            self.embed_batch_size = min(self.max_batch_size, self.embed_batch_size + 8)
+
+    def _on_error(self, e: Exception, attempt: int) -> float:
+        """Returns the backoff before retrying `e`, or re-raises if it is not retryable."""
+        if not (is_retryable_error(e) or is_transient_error(e)) or attempt + 1 >= self.max_attempts:
+            raise e
+        backoff = min(60.0, 2.0 ** attempt)
+        if getattr(e, "code", None) == 429:
+            self._streak = 0
+            self.embed_batch_size = max(self.min_batch_size, self.embed_batch_size // 2)
+            backoff = retry_after_seconds(e) or backoff
+            print(
+                f"⚠️ Gemini embedding rate-limited (429); waiting {backoff:.1f}s, "
+                f"batch size now {self.embed_batch_size}",
+                file=sys.stderr,
+            )
+        return backoff
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_attempts):
+            time.sleep(self._reserve_slot())
+            try:
+                embeddings = super()._get_text_embeddings(texts)
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt))
+                continue
+            self._on_success()
+            return embeddings
 
-Settings.embed_model = GoogleGenAIEmbedding(
-    model=EMBED_MODEL, 
-    api_key=GEMINI_API_KEY
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(self._reserve_slot())
+            try:
+                embeddings = await super()._aget_text_embeddings(texts)
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt))
+                continue
+            self._on_success()
+            return embeddings
+
+    async def aget_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False
+    ) -> List[List[float]]:
+        results: List[List[float]] = [None] * len(texts)
+        cursor = 0
+
+        async def _worker():
+            nonlocal cursor
+            # Slices are cut at dispatch time so a shrink after a 429 applies to the next batch
+            while cursor < len(texts):
+                start = cursor
+                cursor = min(len(texts), start + self.embed_batch_size)
+                end = cursor
+                results[start:end] = await self._aget_text_embeddings(texts[start:end])
+
+        workers = [asyncio.create_task(_worker()) for _ in range(self.max_concurrent_batches)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            # One batch failed for good (or we were cancelled): stop the others sending requests
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        return results
+
+Settings.embed_model = CachingEmbedding(
+    ConcurrentGoogleGenAIEmbedding(
+        model=EMBED_MODEL,
+        api_key=GEMINI_API_KEY,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        max_batch_size=EMBED_BATCH_SIZE,
+        max_concurrent_batches=EMBED_CONCURRENCY,
+        requests_per_minute=EMBED_RPM
+    ),
+    cache_path=EMBED_CACHE_PATH,
+    semantic_tau=SEMANTIC_CACHE_TAU
 )
 
 # --- HELPER: Windows-safe directory deletion ---
@@ -34,78 +227,362 @@ def cleanup_temp_dir(path: str):
             print(f"Warning: Failed to clean up temp dir {path}: {e}")
 # -----------------------------------------------
 
+def _strip_top_level(members):
+    """Drops the '<repo>-<sha>/' prefix GitHub puts on every archive member."""
+    for member in members:
+        parts = member.name.split("/", 1)
+        if len(parts) < 2 or not parts[1]:
+            continue
+        member.name = parts[1]
+        if member.islnk():
+            member.linkname = member.linkname.split("/", 1)[-1]
+        yield member
+
+def fetch_github_tarball(repo_url: str, dest: str):
+    """Downloads the default branch of a GitHub repo as a tarball and extracts it into dest."""
+    owner, repo = GITHUB_URL_RE.match(repo_url).groups()
+    url = f"https://github.com/{owner}/{repo}/archive/HEAD.tar.gz"
+
+    with tempfile.SpooledTemporaryFile(max_size=TARBALL_SPOOL_BYTES) as buf:
+        with httpx.Client(http2=HTTP2, follow_redirects=True, timeout=60.0) as client:
+            with client.stream("GET", url) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    buf.write(chunk)
+        buf.seek(0)
+        with tarfile.open(fileobj=buf, mode="r:gz") as tar:
+            tar.extractall(dest, members=_strip_top_level(tar), filter="data")
+
+def fetch_repository(repo_url: str, dest: str):
+    """
+    Fetches a snapshot of the repo into dest.
+    GitHub repos are downloaded as a tarball (no .git history); anything else, or a failed
+    download (e.g. a private repo), falls back to a shallow, blobless git clone.
+    """
+    if GITHUB_URL_RE.match(repo_url):
+        try:
+            fetch_github_tarball(repo_url, dest)
+            return
+        except (httpx.HTTPError, tarfile.TarError) as e:
+            print(f"⚠️ Tarball download failed ({e}), falling back to git clone")
+            cleanup_temp_dir(dest)
+            os.makedirs(dest, exist_ok=True)
+
+    git.Repo.clone_from(repo_url, dest, multi_options=["--depth=1", "--filter=blob:none"])
+
+# One client and a handful of open collections per process; reopening the
+# SQLite store and HNSW segments on every call is the expensive part.
+@lru_cache(maxsize=1)
+def _db():
+    return chromadb.PersistentClient(path=CHROMA_DB_PATH)
+
+@lru_cache(maxsize=64)
+def _get_collection(collection_name):
+    return _db().get_or_create_collection(collection_name, metadata=COLLECTION_METADATA)
+
+def collect_files(root: str):
+    """
+    Walks root with os.scandir and returns the source files worth ingesting.
+    Pruned and hidden directories are skipped without being descended into.
+    """
+    files = []
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in PRUNE_DIRS:
+                        stack.append(entry.path)
+                elif (
+                    os.path.splitext(entry.name)[1] in REPO_EXTS
+                    and entry.is_file()
+                    and entry.stat().st_size < MAX_FILE_BYTES
+                ):
+                    files.append(entry.path)
+    return sorted(files)
+
+def get_chroma_collection(collection_name):
+    return _get_collection(collection_name)
+
 def get_chroma_vector_store(collection_name):
-    db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    chroma_collection = db.get_or_create_collection(collection_name)
-    return ChromaVectorStore(chroma_collection=chroma_collection)
+    return ChromaVectorStore(chroma_collection=get_chroma_collection(collection_name))
+
+def upsert_nodes(collection, nodes, embeddings: np.ndarray):
+    """
+    Writes nodes straight to Chroma in the layout ChromaVectorStore.add uses,
+    so the collection stays readable through LlamaIndex.
+    Embeddings are L2-normalized in place; Gemini's are not unit-length.
+    """
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+    ids = [node.node_id for node in nodes]
+    metadatas = []
+    for node in nodes:
+        metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=True)
+        metadatas.append({k: "" if v is None else v for k, v in metadata.items()})
+    collection.upsert(
+        ids=ids,
+        embeddings=embeddings,
+        documents=[node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes],
+        metadatas=metadatas,
+    )
+
+def iter_documents(reader: SimpleDirectoryReader, slice_files: int = LOAD_SLICE_FILES):
+    """
+    Yields the reader's documents in slices of `slice_files` files, read by INGEST_WORKERS workers.
+    Large trees use a spawned process pool (as load_data does); small ones use threads,
+    where process startup would dominate.
+    """
+    files = reader.input_files
+    load_file = partial(
+        SimpleDirectoryReader.load_file,
+        file_metadata=reader.file_metadata,
+        file_extractor=reader.file_extractor,
+        filename_as_id=reader.filename_as_id,
+        encoding=reader.encoding,
+        errors=reader.errors,
+        raise_on_error=reader.raise_on_error,
+        fs=reader.fs,
+    )
+    if INGEST_WORKERS > 1 and len(files) >= PARALLEL_LOAD_MIN_FILES:
+        pool = multiprocessing.get_context("spawn").Pool(INGEST_WORKERS)
+    else:
+        pool = ThreadPool(max(1, INGEST_WORKERS))
+
+    with pool:
+        documents = []
+        for i, docs in enumerate(pool.imap(load_file, files), 1):
+            documents.extend(docs)
+            if i % slice_files == 0:
+                # load_data applies the reader's metadata exclusions last; mirror it
+                yield reader._exclude_metadata(documents)
+                documents = []
+        if documents:
+            yield reader._exclude_metadata(documents)
+
+def embed_documents(documents):
+    """
+    Chunks documents and embeds the nodes in batches of EMBED_BATCH_SIZE.
+    Falls back to one request per chunk if the batched call fails.
+    """
+    splitter = SentenceSplitter()
+    pipeline = IngestionPipeline(transformations=[splitter, Settings.embed_model])
+    try:
+        return pipeline.run(documents=documents, num_workers=1)
+    except Exception as e:
+        print(f"⚠️ Batch embedding failed ({e}), retrying per chunk")
+        nodes = splitter.get_nodes_from_documents(documents)
+        for node in nodes:
+            node.embedding = Settings.embed_model.get_text_embedding(
+                node.get_content(metadata_mode=MetadataMode.EMBED)
+            )
+        return nodes
+
+async def _aembed_nodes(nodes):
+    """Embeds one batch of nodes, falling back to one request per chunk on failure."""
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    try:
+        embeddings = await Settings.embed_model.aget_text_embedding_batch(texts)
+    except Exception as e:
+        print(f"⚠️ Batch embedding failed ({e}), retrying per chunk")
+        embeddings = [await Settings.embed_model.aget_text_embedding(t) for t in texts]
+    return np.asarray(embeddings, dtype=np.float32)
+
+async def stream_ingest(reader: SimpleDirectoryReader, collection):
+    """
+    Streams the reader's files through read -> chunk -> embed -> upsert.
+    Each stage is a task connected by bounded queues, so chunking overlaps with in-flight
+    embedding requests and memory stays proportional to the queue depth, not the repo size.
+    """
+    docs_q = asyncio.Queue(maxsize=4)
+    nodes_q = asyncio.Queue(maxsize=4 * EMBED_BATCH_SIZE)
+    embedded_q = asyncio.Queue(maxsize=4)
+
+    async def read():
+        slices = iter_documents(reader)
+        while (documents := await asyncio.to_thread(next, slices, None)) is not None:
+            await docs_q.put(documents)
+        await docs_q.put(None)
+
+    async def chunk():
+        # Splitting is pure-Python and GIL-bound, so large repos shard it across processes.
+        # Workers only import chunking.py, but spawn also re-imports the caller's __main__
+        # module: scripts that ingest must keep their entry point behind a __main__ guard.
+        if len(reader.input_files) >= PARALLEL_CHUNK_MIN_FILES:
+            workers = os.cpu_count() or 1
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            workers, pool = 1, None
+        # A slice makes about LOAD_SLICE_FILES / CHUNK_TASK_DOCS tasks; enough slices are
+        # chunked at once to give every worker a task
+        max_in_flight = -(-workers * CHUNK_TASK_DOCS // LOAD_SLICE_FILES)
+        in_flight = deque()
+
+        async def emit(node_lists):
+            for nodes in await node_lists:
+                for node in nodes:
+                    await nodes_q.put(node)
+
+        loop = asyncio.get_running_loop()
+        try:
+            while (documents := await docs_q.get()) is not None:
+                if pool is None:
+                    in_flight.append(asyncio.gather(asyncio.to_thread(chunk_documents, documents)))
+                else:
+                    in_flight.append(asyncio.gather(*[
+                        loop.run_in_executor(pool, chunk_documents, documents[i:i + CHUNK_TASK_DOCS])
+                        for i in range(0, len(documents), CHUNK_TASK_DOCS)
+                    ]))
+                # Slices are emitted in read order
+                if len(in_flight) >= max_in_flight:
+                    await emit(in_flight.popleft())
+            while in_flight:
+                await emit(in_flight.popleft())
+        except BaseException:
+            # Failed or cancelled: drop queued tasks without blocking the loop on running ones
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        if pool is not None:
+            # Joining the worker processes blocks, so it happens off the event loop
+            await asyncio.to_thread(pool.shutdown)
+        for _ in range(EMBED_CONCURRENCY):
+            await nodes_q.put(None)
+
+    # Chunk-text hash -> future of its embedding while a worker is embedding it, so that
+    # byte-identical chunks (license headers, vendored copies) in flight together share one
+    # request. Entries leave once resolved; later repeats are served by the embedding cache.
+    in_flight = {}
+
+    async def embed_unique(nodes, futures, fresh):
+        """Embeds the first occurrence of each new text, then gathers every node's vector."""
+        if fresh:
+            try:
+                embeddings = await _aembed_nodes([nodes[i] for i in fresh.values()])
+            except Exception as e:
+                for key in fresh:
+                    in_flight.pop(key).set_exception(e)
+                raise
+            for key, embedding in zip(fresh, embeddings):
+                in_flight.pop(key).set_result(embedding)
+        return np.stack([await future for future in futures])
+
+    async def embed():
+        loop = asyncio.get_running_loop()
+        nodes, futures, fresh = [], [], {}
+        while (node := await nodes_q.get()) is not None:
+            key = hashlib.blake2b(node.get_content().encode("utf-8"), digest_size=16).digest()
+            future = in_flight.get(key)
+            if future is None:
+                future = in_flight[key] = loop.create_future()
+                fresh[key] = len(nodes)
+            nodes.append(node)
+            futures.append(future)
+            # Batches fill up with texts that actually need an API call, up to a cap on repeats
+            if len(fresh) == EMBED_BATCH_SIZE or len(nodes) == EMBED_BATCH_MAX_NODES:
+                await embedded_q.put((nodes, await embed_unique(nodes, futures, fresh)))
+                nodes, futures, fresh = [], [], {}
+        if nodes:
+            await embedded_q.put((nodes, await embed_unique(nodes, futures, fresh)))
+
+    async def upsert():
+        # One preallocated float32 block per upsert; sized on the first batch
+        buf, pending = None, []
+        while (item := await embedded_q.get()) is not None:
+            nodes, embeddings = item
+            if buf is None:
+                buf = np.empty((UPSERT_BATCH_SIZE, embeddings.shape[1]), dtype=np.float32)
+            # Fill the block to exactly UPSERT_BATCH_SIZE, splitting batches across flushes
+            start = 0
+            while start < len(nodes):
+                take = min(len(nodes) - start, UPSERT_BATCH_SIZE - len(pending))
+                buf[len(pending):len(pending) + take] = embeddings[start:start + take]
+                pending.extend(nodes[start:start + take])
+                start += take
+                if len(pending) == UPSERT_BATCH_SIZE:
+                    await asyncio.to_thread(upsert_nodes, collection, pending, buf)
+                    pending = []
+        if pending:
+            await asyncio.to_thread(upsert_nodes, collection, pending, buf[:len(pending)])
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(read())
+            tg.create_task(chunk())
+            embedders = [tg.create_task(embed()) for _ in range(EMBED_CONCURRENCY)]
+            writer = tg.create_task(upsert())
+            await asyncio.gather(*embedders)
+            await embedded_q.put(None)
+            await writer
+    except ExceptionGroup as eg:
+        # Surface the failing stage's error rather than the group wrapper
+        raise eg.exceptions[0]
+
+def prepare_repository(repo_url: str, collection_name: str, temp_dir: str):
+    """Fetches the repository into temp_dir and returns a reader over its source files."""
+    fetch_repository(repo_url, temp_dir)
+    # Metadata is attached as each file loads; file_path is stored relative to the repo root
+    file_metadata = FileMetadata(
+        {"source_type": "git_repo", "repo_url": repo_url, "collection": collection_name},
+        root=temp_dir,
+    )
+    return SimpleDirectoryReader(input_files=collect_files(temp_dir), file_metadata=file_metadata)
+
+def reset_collection(collection_name: str):
+    """Drops any previous copy of the collection and returns a fresh one."""
+    try:
+        _db().delete_collection(collection_name)
+    except:
+        pass
+    # Cached handles may point at the collection that was just dropped
+    _get_collection.cache_clear()
+
+    return get_chroma_collection(collection_name)
 
 def ingest_repository(repo_url: str, collection_name: str):
+    """Blocking wrapper around ingest_repository_async; must not be called from a running event loop."""
+    asyncio.run(ingest_repository_async(repo_url, collection_name))
+
+async def ingest_repository_async(repo_url: str, collection_name: str):
+    """
+    Fetches a repository and streams it into `collection_name`.
+    Fetching, file reads and Chroma writes run in worker threads; embedding batches run concurrently.
+    """
     # Create a unique temporary directory for this specific ingestion
     temp_dir = get_unique_temp_dir()
 
     print(f"🚀 Ingesting Repo: {repo_url} -> {collection_name} (Temp: {temp_dir})")
     try:
-        git.Repo.clone_from(repo_url, temp_dir)
-        
-        required_exts = [".py", ".js", ".ts", ".html", ".css", ".md", ".json", ".txt", ".java", ".cpp"]
-        reader = SimpleDirectoryReader(
-            input_dir=temp_dir,
-            recursive=True,
-            required_exts=required_exts,
-            exclude=["*.git*", "*node_modules*"]
-        )
-        documents = reader.load_data()
-        
-        for doc in documents:
-            # Get relative path for cleaner display
-            abs_path = doc.metadata.get("file_path", "")
-            rel_path = os.path.relpath(abs_path, temp_dir) if abs_path else "unknown"
-            
-            doc.metadata.update({
-                "source_type": "git_repo", 
-                "repo_url": repo_url, 
-                "collection": collection_name,
-                "file_path": rel_path
-            })
-
-        db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-        try:
-            db.delete_collection(collection_name)
-        except:
-            pass 
-            
-        vector_store = get_chroma_vector_store(collection_name)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        
-        VectorStoreIndex.from_documents(documents, storage_context=storage_context)
+        reader = await asyncio.to_thread(prepare_repository, repo_url, collection_name, temp_dir)
+        collection = await asyncio.to_thread(reset_collection, collection_name)
+
+        await stream_ingest(reader, collection)
         print(f"✅ Repo synced to {collection_name}")
-        
+
     except Exception as e:
         print(f"❌ Repo Ingestion Error: {e}")
         raise e
     finally:
         # Clean up ONLY this specific temporary directory
-        cleanup_temp_dir(temp_dir)
+        await asyncio.to_thread(cleanup_temp_dir, temp_dir)
 
 def ingest_single_file(file_path: str, collection_name: str, original_filename: str):
     print(f"📂 Injecting file: {original_filename} -> {collection_name}")
     try:
-        reader = SimpleDirectoryReader(input_files=[file_path])
+        file_metadata = FileMetadata(
+            {"source_type": "file_upload", "filename": original_filename, "collection": collection_name}
+        )
+        reader = SimpleDirectoryReader(input_files=[file_path], file_metadata=file_metadata)
         documents = reader.load_data()
-        
-        for doc in documents:
-            doc.metadata.update({
-                "source_type": "file_upload", 
-                "filename": original_filename,
-                "collection": collection_name
-            })
 
         vector_store = get_chroma_vector_store(collection_name)
         storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        
-        VectorStoreIndex.from_documents(documents, storage_context=storage_context)
+
+        nodes = embed_documents(documents)
+        VectorStoreIndex(nodes, storage_context=storage_context)
         print(f"✅ File injected into {collection_name}")
-        
+
     except Exception as e:
         print(f"❌ File Ingestion Error: {e}")
         raise e
\ No newline at end of file
@@ -16,6 +16,7 @@ from llama_index.vector_stores.chroma import ChromaVectorStore
 
 from core_config import settings
 from database import SessionLocal, MemoryTier
+from file_metadata import FileMetadata
 
 def _on_rm_error(func, path, exc_info):
     """
@@ -82,24 +83,27 @@ class MemoryIntakeEngine:
             git.Repo.clone_from(repo_url, temp_dir, depth=1)
 
             # 2. Intelligence Extraction
+            # 3. Metadata Provenance Injection (attached per file as it loads)
             reader = SimpleDirectoryReader(
                 input_dir=temp_dir,
                 recursive=True,
-                required_exts=[".py", ".ts", ".js", ".md", ".json", ".txt"]
-            )
-            documents = reader.load_data()
-
-            # 3. Metadata Provenance Injection
-            for doc in documents:
-                doc.metadata.update({
+                required_exts=[".py", ".ts", ".js", ".md", ".json", ".txt"],
+                file_metadata=FileMetadata({
                     "owner": "Treelight Innovations",
                     "engine": "CoreTexAI",
                     "tier": tier_id,
                     "source_url": repo_url
                 })
+            )
+            # Worker processes only pay for their startup on larger trees
+            parallel = settings.INGEST_WORKERS > 1 and len(reader.input_files) >= settings.PARALLEL_LOAD_MIN_FILES
+            num_workers = settings.INGEST_WORKERS if parallel else None
+            documents = reader.load_data(num_workers=num_workers)
 
             # 4. Vector Tier Persistence (Incremental Upsert)
-            collection = self.chroma_client.get_or_create_collection(tier_id)
+            collection = self.chroma_client.get_or_create_collection(
+                tier_id, metadata={"hnsw:space": "cosine"}
+            )
             vector_store = ChromaVectorStore(chroma_collection=collection)
             storage_context = StorageContext.from_defaults(vector_store=vector_store)
             
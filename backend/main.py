@@ -3,7 +3,9 @@ CoreTexAI Gateway
 Proprietary product of Treelight Innovations.
 High-performance API entry point for the flagship Memory Orchestration Engine.
 """
-from fastapi import FastAPI, HTTPException, Security, Depends, Request, BackgroundTasks
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Security, Depends, Request
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -14,12 +16,23 @@ from database import init_db, SessionLocal, MemoryTier
 from orchestrator import MemoryOrchestrator
 from intake_engine import MemoryIntakeEngine
 
-# Initialize Core Services
-init_db()
-orchestrator = MemoryOrchestrator()
-intake_engine = MemoryIntakeEngine()
+# Core Services, built by the lifespan below rather than at import: the intake engine's
+# spawned loader processes re-import modules, and must not open databases or clients each time.
+orchestrator: Optional[MemoryOrchestrator] = None
+intake_engine: Optional[MemoryIntakeEngine] = None
 
-app = FastAPI(title=f"{settings.PROJECT_NAME} Gateway", version=settings.VERSION)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global orchestrator, intake_engine
+    init_db()
+    orchestrator = MemoryOrchestrator()
+    intake_engine = MemoryIntakeEngine()
+    if settings.WARM_AT_STARTUP:
+        # Pre-builds tier retrievers off the event loop so the first /chat skips index loading
+        await asyncio.to_thread(orchestrator.warm_engines)
+    yield
+
+app = FastAPI(title=f"{settings.PROJECT_NAME} Gateway", version=settings.VERSION, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,11 +59,16 @@ class ChatRequest(BaseModel):
     tier_id: str
     message: str
     thinking_mode: str = "medium"
+    # Conversation memory is kept per session; omit to share the tier's default session
+    session_id: Optional[str] = None
 
 class IntakeRequest(BaseModel):
     repo_url: str
     tier_id: str
 
+# Intakes currently running in this process, keyed by tier_id
+intake_in_progress: dict[str, asyncio.Task] = {}
+
 # --- Endpoints ---
 @app.get("/health")
 def health():
@@ -81,7 +99,10 @@ async def get_intake_status(tier_id: str):
     }
 
 @app.post("/intake", dependencies=[Depends(validate_key)])
-async def trigger_intake(request: IntakeRequest, background_tasks: BackgroundTasks):
+async def trigger_intake(request: IntakeRequest):
+    if request.tier_id in intake_in_progress:
+        raise HTTPException(status_code=409, detail="Intake already in progress for this Memory Tier")
+
     db = SessionLocal()
     existing = db.query(MemoryTier).filter(MemoryTier.tier_id == request.tier_id).first()
     if not existing:
@@ -93,7 +114,11 @@ async def trigger_intake(request: IntakeRequest, background_tasks: BackgroundTas
         db.commit()
     db.close()
 
-    background_tasks.add_task(intake_engine.intake_repository, request.repo_url, request.tier_id)
+    # The intake itself runs its blocking work in the engine's executor; the task only
+    # tracks it so a second request for the same tier is rejected instead of racing it.
+    task = asyncio.create_task(intake_engine.intake_repository(request.repo_url, request.tier_id))
+    intake_in_progress[request.tier_id] = task
+    task.add_done_callback(lambda _: intake_in_progress.pop(request.tier_id, None))
     return {"status": "accepted", "tier_id": request.tier_id}
 
 @app.post("/chat", dependencies=[Depends(validate_key)])
@@ -104,7 +129,8 @@ async def chat_endpoint(request: ChatRequest):
     response = await orchestrator.execute_reasoning(
         request.tier_id, 
         request.message, 
-        mode=request.thinking_mode
+        mode=request.thinking_mode,
+        session_id=request.session_id
     )
     return {
         "engine": settings.PROJECT_NAME,
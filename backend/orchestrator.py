@@ -3,14 +3,23 @@ CoreTexAI Memory Orchestrator
 Proprietary product of Treelight Innovations.
 Responsible for high-performance retrieval using Gemini 3.1 Pro.
 """
+import asyncio
 import chromadb
+from collections import OrderedDict
 from typing import List, Optional, Dict
 from google.genai import types
 from llama_index.core import VectorStoreIndex, Settings
+from llama_index.core.chat_engine import ContextChatEngine
+from llama_index.core.memory import ChatMemoryBuffer
 from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
 from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.vector_stores.chroma import ChromaVectorStore
 from core_config import settings
+from chroma_store import ThreadedChromaVectorStore
+from embed_cache import CachingEmbedding
+from gemini_http import use_pooled_client
+
+# Chat sessions whose memory is kept; the least recently used are dropped beyond this
+MAX_CHAT_SESSIONS = 256
 
 class MemoryOrchestrator:
     """
@@ -31,52 +40,119 @@ class MemoryOrchestrator:
         )
 
         # Configure the Flagship Brain: Gemini 3.1 Pro
-        Settings.llm = GoogleGenAI(
-            model=settings.LLM_MODEL, 
-            api_key=settings.GEMINI_API_KEY,
-            http_options=resilient_options
+        # LLM and embeddings share one pooled HTTP connection (TLS paid once per process)
+        Settings.llm = use_pooled_client(
+            GoogleGenAI(
+                model=settings.LLM_MODEL, 
+                api_key=settings.GEMINI_API_KEY,
+                http_options=resilient_options
+            ),
+            settings.GEMINI_API_KEY, resilient_options
         )
-        Settings.embed_model = GoogleGenAIEmbedding(
-            model=settings.EMBED_MODEL, 
-            api_key=settings.GEMINI_API_KEY,
-            http_options=resilient_options
+        # Content-hash cache so re-intake only embeds changed chunks
+        Settings.embed_model = CachingEmbedding(
+            use_pooled_client(
+                GoogleGenAIEmbedding(
+                    model=settings.EMBED_MODEL, 
+                    api_key=settings.GEMINI_API_KEY,
+                    http_options=resilient_options,
+                    embed_batch_size=100
+                ),
+                settings.GEMINI_API_KEY, resilient_options
+            ),
+            cache_path=settings.EMBED_CACHE_PATH,
+            semantic_tau=settings.SEMANTIC_CACHE_TAU
         )
         
         self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
-        self._active_engines: Dict[str, any] = {}
+        # Long-lived per tier; chat engines per (tier_id, session_id) only add memory on top
+        self._retrievers: Dict[str, any] = {}
+        self._active_engines: "OrderedDict[tuple, any]" = OrderedDict()
+        # One lock per tier so concurrent first hits build its retriever only once
+        self._build_locks: Dict[str, asyncio.Lock] = {}
 
-    async def get_tier_engine(self, tier_id: str):
-        """Retrieves a stateful chat engine for the specified Memory Tier."""
-        if tier_id in self._active_engines:
-            return self._active_engines[tier_id]
+    def _build_retriever(self, tier_id: str):
+        """Loads a Memory Tier's index and returns its retriever. Blocking."""
+        collection = self.chroma_client.get_collection(tier_id)
+        # /chat runs on the event loop; keep Chroma searches off it
+        vector_store = ThreadedChromaVectorStore(chroma_collection=collection)
+        index = VectorStoreIndex.from_vector_store(
+            vector_store,
+            embed_model=Settings.embed_model
+        )
+        return index.as_retriever(similarity_top_k=5)
 
-        try:
-            collection = self.chroma_client.get_collection(tier_id)
-            vector_store = ChromaVectorStore(chroma_collection=collection)
-            index = VectorStoreIndex.from_vector_store(
-                vector_store,
-                embed_model=Settings.embed_model
-            )
-            
-            # CoreTexAI System Prompting
-            engine = index.as_chat_engine(
-                chat_mode="context",
-                system_prompt=(
-                    f"You are CoreTexAI by {settings.ORGANIZATION}. "
-                    f"Operating on Memory Tier '{tier_id}'. "
-                    "Utilize your assigned thinking mode to provide high-fidelity insights."
-                )
+    def _new_engine(self, tier_id: str, retriever):
+        """A chat engine with its own memory over a Memory Tier's shared retriever."""
+        # CoreTexAI System Prompting
+        return ContextChatEngine.from_defaults(
+            retriever=retriever,
+            llm=Settings.llm,
+            memory=ChatMemoryBuffer.from_defaults(llm=Settings.llm),
+            system_prompt=(
+                f"You are CoreTexAI by {settings.ORGANIZATION}. "
+                f"Operating on Memory Tier '{tier_id}'. "
+                "Utilize your assigned thinking mode to provide high-fidelity insights."
             )
-            self._active_engines[tier_id] = engine
-            return engine
-        except Exception:
+        )
+
+    def warm_engines(self):
+        """
+        Pre-builds retrievers for every existing Memory Tier.
+        Blocking; meant to run in an executor at startup.
+        """
+        for collection in self.chroma_client.list_collections():
+            # Newer Chroma clients list names, older ones Collection objects
+            tier_id = getattr(collection, "name", collection)
+            if tier_id in self._retrievers:
+                continue
+            try:
+                self._retrievers.setdefault(tier_id, self._build_retriever(tier_id))
+            except Exception as e:
+                print(f"Warning: Failed to warm Memory Tier '{tier_id}': {e}")
+
+    async def _get_retriever(self, tier_id: str):
+        """Returns the tier's long-lived retriever, building it on first use; None if the tier is missing."""
+        if tier_id in self._retrievers:
+            return self._retrievers[tier_id]
+
+        lock = self._build_locks.setdefault(tier_id, asyncio.Lock())
+        async with lock:
+            if tier_id in self._retrievers:
+                return self._retrievers[tier_id]
+            try:
+                retriever = await asyncio.to_thread(self._build_retriever, tier_id)
+            except Exception:
+                return None
+            return self._retrievers.setdefault(tier_id, retriever)
+
+    async def get_tier_engine(self, tier_id: str, session_id: Optional[str] = None):
+        """
+        Retrieves a stateful chat engine for the specified Memory Tier and chat session.
+        Engines are cheap per-session wrappers (just a memory buffer) around the tier's shared retriever.
+        """
+        key = (tier_id, session_id)
+        if key in self._active_engines:
+            self._active_engines.move_to_end(key)
+            return self._active_engines[key]
+
+        retriever = await self._get_retriever(tier_id)
+        if retriever is None:
             return None
 
-    async def execute_reasoning(self, tier_id: str, query: str, mode: str = "medium") -> str:
+        engine = self._active_engines.setdefault(key, self._new_engine(tier_id, retriever))
+        # Evict the least recently used sessions' memory
+        while len(self._active_engines) > MAX_CHAT_SESSIONS:
+            self._active_engines.popitem(last=False)
+        return engine
+
+    async def execute_reasoning(
+        self, tier_id: str, query: str, mode: str = "medium", session_id: Optional[str] = None
+    ) -> str:
         """
         Executes a reasoning task with a specific Gemini 3.1 thinking mode.
         """
-        engine = await self.get_tier_engine(tier_id)
+        engine = await self.get_tier_engine(tier_id, session_id)
         if not engine:
             return "CoreTexAI Error: Memory Tier uninitialized."
             
@@ -0,0 +1,70 @@
+"""
+Speculative retrieval while the user is still typing.
+PrefetchingRetriever starts retrieving a draft question once typing pauses; if the question
+that is finally sent is the same text, the chat engine gets those nodes without waiting on
+the query embedding and the vector search, leaving only the LLM call on the critical path.
+"""
+import asyncio
+from typing import List, Optional
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+# Seconds without a keystroke before the draft is retrieved
+PREFETCH_DEBOUNCE = 0.3
+
+# Drafts shorter than this are not worth an embedding call
+PREFETCH_MIN_CHARS = 8
+
+class PrefetchingRetriever(BaseRetriever):
+    """Wraps a retriever; prefetch() retrieves drafts in the background, aretrieve() reuses a matching one."""
+
+    def __init__(self, retriever: BaseRetriever, debounce: float = PREFETCH_DEBOUNCE):
+        super().__init__(callback_manager=retriever.callback_manager)
+        self._retriever = retriever
+        self._debounce = debounce
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._text: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def prefetch(self, text: str):
+        """Called on every edit from the event loop; retrieves `text` once it stops changing."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self._debounce, self._start, text.strip())
+
+    def _start(self, text: str):
+        self._timer = None
+        if text == self._text or len(text) < PREFETCH_MIN_CHARS:
+            return
+        # The superseded search may already be running in a worker thread; cancelling just drops its result
+        if self._task is not None:
+            self._task.cancel()
+        self._text = text
+        self._task = asyncio.create_task(self._retriever.aretrieve(text))
+
+    def _take(self, query_str: str) -> Optional[asyncio.Task]:
+        """Returns the prefetch task if it was for `query_str`, and clears all pending prefetch state."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task, text = self._task, self._text
+        self._task = self._text = None
+        if task is None or text != query_str.strip():
+            if task is not None:
+                task.cancel()
+            return None
+        return task
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._retriever.retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        task = self._take(query_bundle.query_str)
+        if task is not None:
+            try:
+                return await task
+            except Exception:
+                # A failed prefetch just falls back to retrieving now
+                pass
+        return await self._retriever.aretrieve(query_bundle)
@@ -1,23 +1,41 @@
 import os
 import chromadb
+import functools
 from llama_index.core import VectorStoreIndex, StorageContext, Settings
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.llms.google_genai import GoogleGenAI
 from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
+from llama_index.core.indices.query.query_transform import HyDEQueryTransform
+from llama_index.core.query_engine import RetrieverQueryEngine, TransformQueryEngine
+from llama_index.core.schema import QueryBundle
 
 # Centralized configuration
-from config import CHROMA_DB_PATH, GEMINI_API_KEY, LLM_MODEL, EMBED_MODEL
+from config import (
+    CHROMA_DB_PATH, GEMINI_API_KEY, LLM_MODEL, EMBED_MODEL, EMBED_CACHE_PATH, QUERY_CACHE_TAU, HYDE
+)
+from embed_cache import CachingEmbedding
+from gemini_http import use_pooled_client
 
-# 1. SETUP
-Settings.llm = GoogleGenAI(model=LLM_MODEL, api_key=GEMINI_API_KEY)
-Settings.embed_model = GoogleGenAIEmbedding(model=EMBED_MODEL, api_key=GEMINI_API_KEY)
+COLLECTION_NAME = "cortex_repo"
 
-# 2. LOAD DATABASE
-db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+@functools.cache
+def build_engine():
+    """Configures Settings and builds the query engine once per process; importing this module does neither."""
+    # 1. SETUP
+    # The LLM and the embedding model share one pooled connection
+    Settings.llm = use_pooled_client(GoogleGenAI(model=LLM_MODEL, api_key=GEMINI_API_KEY), GEMINI_API_KEY)
+    # Caches query vectors and embeds all of a query's HyDE strings in a single request
+    Settings.embed_model = CachingEmbedding(
+        use_pooled_client(GoogleGenAIEmbedding(model=EMBED_MODEL, api_key=GEMINI_API_KEY), GEMINI_API_KEY),
+        cache_path=EMBED_CACHE_PATH,
+        query_tau=QUERY_CACHE_TAU
+    )
+
+    # 2. LOAD DATABASE
+    db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
-# Get the collection we created earlier (assuming 'cortex_repo' exists for testing)
-try:
-    chroma_collection = db.get_collection("cortex_repo")
+    # Get the collection we created earlier (assuming 'cortex_repo' exists for testing)
+    chroma_collection = db.get_collection(COLLECTION_NAME)
     vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
     # 3. CREATE QUERY ENGINE
@@ -27,13 +45,32 @@ try:
         storage_context=storage_context,
     )
 
-    query_engine = index.as_query_engine()
+    # Explicit top_k, and "compact" packs the retrieved chunks into as few LLM calls as possible
+    retriever = index.as_retriever(similarity_top_k=5)
+    query_engine = RetrieverQueryEngine.from_args(retriever, response_mode="compact", streaming=True)
+    if HYDE:
+        query_engine = TransformQueryEngine(query_engine, HyDEQueryTransform(include_original=True))
+    return query_engine
+
+def ask(question: str):
+    """Runs `question` through the query engine and returns its streaming response."""
+    query_engine = build_engine()
+    # Embed once up front (served from the query cache on repeats); HyDE embeds its own strings
+    embedding = None if HYDE else Settings.embed_model.get_query_embedding(question)
+    return query_engine.query(QueryBundle(query_str=question, embedding=embedding))
+
+def main():
+    try:
+        # 4. ASK A QUESTION
+        question = "How does this codebase handle ingestion?"
+        print(f"\n❓ Question: {question}\n")
 
-    # 4. ASK A QUESTION
-    question = "How does this codebase handle ingestion?"
-    print(f"\n❓ Question: {question}\n")
+        response = ask(question)
+        print("🤖 Answer:")
+        response.print_response_stream()
+        print()
+    except Exception as e:
+        print(f"⚠️ Error loading collection: {e}")
 
-    response = query_engine.query(question)
-    print(f"🤖 Answer:\n{response}")
-except Exception as e:
-    print(f"⚠️ Error loading collection: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
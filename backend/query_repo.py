@@ -1,32 +1,226 @@
 import os
-import chromadb
+import sys
+import time
+import queue
+import asyncio
+import hashlib
+import functools
+import threading
+import importlib.util
+from collections import OrderedDict
 from llama_index.core import VectorStoreIndex, StorageContext, Settings
+from llama_index.core.chat_engine import ContextChatEngine
+from llama_index.core.chat_engine.utils import get_response_synthesizer
+from llama_index.core.llms import ChatMessage, MessageRole
 from llama_index.embeddings.google_genai import GoogleGenAIEmbedding
 from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.vector_stores.chroma import ChromaVectorStore
 
 # Centralized configuration
-from config import CHROMA_DB_PATH, GEMINI_API_KEY, LLM_MODEL, EMBED_MODEL
+from config import (
+    CHROMA_DB_PATH, CHROMA_HOST, CHROMA_PORT, GEMINI_API_KEY, LLM_MODEL, EMBED_MODEL,
+    EMBED_CACHE_PATH, QUERY_CACHE_TAU, RESPONSE_CACHE
+)
+from chroma_store import chroma_client, warm_collection, ThreadedChromaVectorStore
+from embed_cache import CachingEmbedding, normalize_query
+from gemini_http import use_fast_json, use_pooled_client
+from prefetch import PrefetchingRetriever
 
 # 1. SETUP
-Settings.llm = GoogleGenAI(model=LLM_MODEL, api_key=GEMINI_API_KEY)
-Settings.embed_model = GoogleGenAIEmbedding(model=EMBED_MODEL, api_key=GEMINI_API_KEY)
+# orjson (if installed) parses each streamed Gemini chunk on the per-token path
+use_fast_json()
+# The LLM and the embedding model share one pooled connection, so TLS setup is paid once per process
+Settings.llm = use_pooled_client(GoogleGenAI(model=LLM_MODEL, api_key=GEMINI_API_KEY), GEMINI_API_KEY)
+# Repeated and near-repeated questions reuse their query embedding instead of calling the API
+Settings.embed_model = CachingEmbedding(
+    use_pooled_client(GoogleGenAIEmbedding(model=EMBED_MODEL, api_key=GEMINI_API_KEY), GEMINI_API_KEY),
+    cache_path=EMBED_CACHE_PATH,
+    query_tau=QUERY_CACHE_TAU
+)
 
 COLLECTION_NAME = "cortex_repo"
 
-def start_chat():
-    print(f"🔌 Connecting to Vector Store at {CHROMA_DB_PATH}...")
+# Sent as the system message every turn. It is far below Gemini's minimum size for cached
+# content (1k+ tokens), and the context chat engine rebuilds the system message with each
+# turn's retrieved context anyway, so a server-side cachedContents handle cannot apply here.
+SYSTEM_PROMPT = (
+    "You are a specialized code assistant. You have access to a specific codebase. "
+    "Always answer questions based on the provided context from the repository. "
+    "If the answer isn't in the code, say so."
+)
+
+class FixedPromptChatEngine(ContextChatEngine):
+    """
+    ContextChatEngine for a system prompt that never changes. The stock engine re-joins the
+    context templates with the system prompt on every turn; here the resulting system messages
+    are built once, and each turn only appends the chat history and the user slot.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        system_prompt, self._fixed_prefix = "", self._prefix_messages
+        if self._prefix_messages and self._prefix_messages[0].role == MessageRole.SYSTEM:
+            system_prompt = str(self._prefix_messages[0].content).strip()
+            self._fixed_prefix = self._prefix_messages[1:]
+        role = self._llm.metadata.system_role
+        self._qa_system = ChatMessage(content=self._context_template.template + system_prompt, role=role)
+        self._refine_system = ChatMessage(
+            content=self._context_refine_template.template + system_prompt, role=role
+        )
+        self._query_slot = ChatMessage(content="{query_str}", role=MessageRole.USER)
+
+    def record_turn(self, message: str, answer: str):
+        """Adds a turn that was answered without the LLM to the chat memory."""
+        self._memory.put_messages([
+            ChatMessage(role=MessageRole.USER, content=message),
+            ChatMessage(role=MessageRole.ASSISTANT, content=answer),
+        ])
+
+    def _get_response_synthesizer(self, chat_history, streaming: bool = False):
+        turn = [*self._fixed_prefix, *chat_history, self._query_slot]
+        return get_response_synthesizer(
+            self._llm,
+            self.callback_manager,
+            [self._qa_system, *turn],
+            [self._refine_system, *turn],
+            streaming,
+            qa_function_mappings=self._context_template.function_mappings,
+            refine_function_mappings=self._context_refine_template.function_mappings,
+        )
+
+class ResponseCache:
+    """
+    Bounded LRU of chat answers. Keys pair the normalized question with a hash of the last
+    `turns` turns of history (normalized the same way), so a repeat only hits when the
+    conversation leading up to it matches.
+    """
+
+    def __init__(self, maxsize: int = 256, turns: int = 3):
+        self.maxsize = maxsize
+        self.turns = turns
+        self._answers = OrderedDict()
+
+    def key(self, question: str, history) -> tuple:
+        recent = history[-2 * self.turns:] if self.turns else []
+        digest = hashlib.sha256()
+        for message in recent:
+            digest.update(f"{message.role.value}\x00{normalize_query(message.content or '')}\x00".encode("utf-8"))
+        return normalize_query(question), digest.digest()
+
+    def get(self, key: tuple):
+        answer = self._answers.get(key)
+        if answer is not None:
+            self._answers.move_to_end(key)
+        return answer
+
+    def put(self, key: tuple, answer: str):
+        self._answers[key] = answer
+        self._answers.move_to_end(key)
+        while len(self._answers) > self.maxsize:
+            self._answers.popitem(last=False)
+
+# Answers to repeated questions, shared by every chat session in the process
+RESPONSES = ResponseCache()
+
+class TokenWriter:
+    """
+    Coalesces streamed tokens into fewer stdout writes: flushes once `min_chars` are buffered,
+    `interval` seconds have passed since the last flush, or a token ends a line.
+    Flushed chunks are encoded once, in stdout's encoding, and written to its binary buffer by
+    a background thread, so the event loop never blocks on the terminal. close() waits for them.
+    """
+
+    def __init__(self, min_chars: int = 32, interval: float = 0.015):
+        self.min_chars = min_chars
+        self.interval = interval
+        self._buf = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+        # Anything already printed must reach the terminal before the raw writes start
+        sys.stdout.flush()
+        self._chunks = queue.SimpleQueue()
+        self._encoding = sys.stdout.encoding or "utf-8"
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def write(self, token: str):
+        self._buf.append(token)
+        self._size += len(token)
+        if (
+            self._size >= self.min_chars
+            or token.endswith("\n")
+            or time.monotonic() - self._last_flush >= self.interval
+        ):
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._chunks.put("".join(self._buf).encode(self._encoding, errors="replace"))
+            self._buf.clear()
+            self._size = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flushes what is left and blocks until every chunk has been written."""
+        self.flush()
+        self._chunks.put(None)
+        self._thread.join()
+
+    def _drain(self):
+        out = sys.stdout.buffer
+        while (chunk := self._chunks.get()) is not None:
+            out.write(chunk)
+            out.flush()
+
+async def ainput(prompt: str) -> str:
+    """input() on a daemon thread, so the event loop keeps running and Ctrl+C isn't held up by it."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _resolve(setter, value):
+        if not future.done():
+            setter(value)
+
+    def _read():
+        try:
+            line = input(prompt)
+        except Exception as e:
+            loop.call_soon_threadsafe(_resolve, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(_resolve, future.set_result, line)
 
+    threading.Thread(target=_read, daemon=True).start()
+    return await future
+
+def input_reader(on_change):
+    """
+    Returns an async `read(prompt)` for the chat loop. On a terminal with prompt_toolkit installed,
+    `on_change(text)` is called on every edit of the line being typed; otherwise it is plain ainput.
+    """
+    if not sys.stdin.isatty() or importlib.util.find_spec("prompt_toolkit") is None:
+        return ainput
+    from prompt_toolkit import PromptSession
+    session = PromptSession()
+    session.default_buffer.on_text_changed += lambda buffer: on_change(buffer.text)
+    return session.prompt_async
+
+@functools.cache
+def get_chat_engine():
+    """
+    Connects to the collection and builds its chat engine once per process; raises if it is missing.
+    Returns the engine and its PrefetchingRetriever, which the input reader feeds drafts to.
+    """
     # 2. CONNECT TO DATABASE
-    db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    
-    try:
-        chroma_collection = db.get_collection(COLLECTION_NAME)
-    except Exception as e:
-        print(f"❌ Collection '{COLLECTION_NAME}' not found. Did you run ingestion.py?")
-        return
+    db = chroma_client(CHROMA_DB_PATH, host=CHROMA_HOST, port=CHROMA_PORT)
+    chroma_collection = db.get_collection(COLLECTION_NAME)
+    # Load the index and page cache while the banner prints and the user types
+    threading.Thread(
+        target=warm_collection,
+        args=(chroma_collection, None if CHROMA_HOST else CHROMA_DB_PATH),
+        daemon=True,
+    ).start()
 
-    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+    # Async chat turns search Chroma in a worker thread
+    vector_store = ThreadedChromaVectorStore(chroma_collection=chroma_collection)
     
     # 3. LOAD INDEX
     index = VectorStoreIndex.from_vector_store(
@@ -35,35 +229,77 @@ def start_chat():
     )
 
     # 4. CREATE CHAT ENGINE
-    chat_engine = index.as_chat_engine(
-        chat_mode="context",
-        system_prompt=(
-            "You are a specialized code assistant. You have access to a specific codebase. "
-            "Always answer questions based on the provided context from the repository. "
-            "If the answer isn't in the code, say so."
-        )
-    )
-
-    print("✅ System Ready! (Type 'exit' to quit)\n")
+    # Retrieval of the question can start while it is still being typed
+    retriever = PrefetchingRetriever(index.as_retriever())
+    chat_engine = FixedPromptChatEngine.from_defaults(retriever=retriever, system_prompt=SYSTEM_PROMPT)
+    return chat_engine, retriever
 
+async def chat_loop(chat_engine, retriever: PrefetchingRetriever):
     # 5. CHAT LOOP
+    read = input_reader(retriever.prefetch)
     while True:
         try:
-            user_input = input("You: ")
+            user_input = await read("You: ")
             if user_input.lower() in ['exit', 'quit', 'q']:
                 break
             
+            key = RESPONSES.key(user_input, chat_engine.chat_history) if RESPONSE_CACHE else None
+            cached = RESPONSES.get(key) if key else None
+            if cached is not None:
+                # Same question after the same recent turns: skip retrieval and the LLM
+                print("\nAI: ", end="", flush=True)
+                writer = TokenWriter()
+                writer.write(cached)
+                writer.close()
+                chat_engine.record_turn(user_input, cached)
+                print("\n" + "-"*50 + "\n")
+                continue
+
             # Streaming response feels faster
-            response = chat_engine.stream_chat(user_input)
+            response = await chat_engine.astream_chat(user_input)
             print("\nAI: ", end="", flush=True)
-            for token in response.response_gen:
-                print(token, end="", flush=True)
+            writer = TokenWriter()
+            tokens = []
+            try:
+                async for token in response.async_response_gen():
+                    tokens.append(token)
+                    writer.write(token)
+            finally:
+                writer.close()
+            if key:
+                RESPONSES.put(key, "".join(tokens))
             print("\n" + "-"*50 + "\n")
             
-        except KeyboardInterrupt:
+        except EOFError:
             break
         except Exception as e:
             print(f"\n❌ Error: {e}\n")
 
+async def chat():
+    target = f"{CHROMA_HOST}:{CHROMA_PORT}" if CHROMA_HOST else CHROMA_DB_PATH
+    print(f"🔌 Connecting to Vector Store at {target}...")
+
+    try:
+        chat_engine, retriever = get_chat_engine()
+    except Exception as e:
+        print(f"❌ Collection '{COLLECTION_NAME}' not found. Did you run ingestion.py?")
+        return
+
+    # The engine is reused across sessions; each session starts a fresh conversation
+    chat_engine.reset()
+    print("✅ System Ready! (Type 'exit' to quit)\n")
+
+    await chat_loop(chat_engine, retriever)
+
+def start_chat():
+    # uvloop trims per-token loop overhead when it is installed
+    if importlib.util.find_spec("uvloop") is not None:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        asyncio.run(chat())
+    except KeyboardInterrupt:
+        pass
+
 if __name__ == "__main__":
     start_chat()
\ No newline at end of file
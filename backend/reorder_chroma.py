@@ -0,0 +1,105 @@
+"""
+Offline pass that rewrites a Chroma collection in vector-similarity order.
+HNSW stores vectors in insertion order, so neighbours visited by one search are scattered across
+pages. Re-adding the vectors grouped by k-means cluster, and ordered along the main principal
+axis within each cluster, puts likely neighbours on the same pages.
+
+Usage: python reorder_chroma.py [collection_name]   (default: cortex_repo)
+Run it while nothing else is writing to the collection.
+"""
+import sys
+import chromadb
+import numpy as np
+
+from config import CHROMA_DB_PATH
+
+# Rows read from / written to Chroma per call
+BATCH_SIZE = 5000
+
+# Rows per block when assigning vectors to centroids, to bound the distance matrix
+ASSIGN_BLOCK = 4096
+
+def export_collection(collection):
+    """Returns ids, float32 embeddings, documents and metadatas for the whole collection."""
+    ids, embeddings, documents, metadatas = [], [], [], []
+    for offset in range(0, collection.count(), BATCH_SIZE):
+        page = collection.get(
+            limit=BATCH_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"]
+        )
+        ids.extend(page["ids"])
+        embeddings.append(np.asarray(page["embeddings"], dtype=np.float32))
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+    return ids, np.concatenate(embeddings), documents, metadatas
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(vectors), dtype=np.int64)
+    c_sq = (centroids ** 2).sum(axis=1)
+    for i in range(0, len(vectors), ASSIGN_BLOCK):
+        block = vectors[i:i + ASSIGN_BLOCK]
+        # ||v - c||^2 up to the per-row constant ||v||^2
+        labels[i:i + ASSIGN_BLOCK] = np.argmin(c_sq - 2.0 * block @ centroids.T, axis=1)
+    return labels
+
+def kmeans(vectors: np.ndarray, k: int, iters: int = 10, seed: int = 0):
+    """Plain Lloyd's k-means; returns (labels, centroids)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iters):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=k)
+        # Empty clusters keep their previous centroid
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return _assign(vectors, centroids), centroids
+
+def similarity_order(vectors: np.ndarray) -> np.ndarray:
+    """Row order grouping similar vectors: clusters sorted along the first principal axis, then rows within each."""
+    n = len(vectors)
+    k = max(1, int(np.sqrt(n)))
+    labels, centroids = kmeans(vectors, k)
+
+    mean = vectors.mean(axis=0)
+    # First principal axis via SVD of a sample; enough to give a stable 1-D ordering
+    sample = vectors[np.random.default_rng(0).choice(n, size=min(n, 10_000), replace=False)] - mean
+    axis = np.linalg.svd(sample, full_matrices=False)[2][0]
+
+    cluster_rank = np.argsort(np.argsort((centroids - mean) @ axis))
+    return np.lexsort(((vectors - mean) @ axis, cluster_rank[labels]))
+
+def reorder_collection(collection_name: str):
+    db = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    collection = db.get_collection(collection_name)
+    if collection.count() < 2:
+        print(f"Nothing to reorder in '{collection_name}'")
+        return
+
+    print(f"📤 Exporting {collection.count()} vectors from '{collection_name}'...")
+    ids, embeddings, documents, metadatas = export_collection(collection)
+    order = similarity_order(embeddings)
+
+    # Build the reordered copy under a temporary name, then swap it in
+    temp_name = f"{collection_name}__reorder"
+    try:
+        db.delete_collection(temp_name)
+    except Exception:
+        pass
+    reordered = db.create_collection(temp_name, metadata=collection.metadata)
+    print(f"📥 Rewriting in similarity order ({len(order)} vectors)...")
+    for i in range(0, len(order), BATCH_SIZE):
+        rows = order[i:i + BATCH_SIZE]
+        reordered.add(
+            ids=[ids[r] for r in rows],
+            embeddings=embeddings[rows],
+            documents=[documents[r] for r in rows],
+            metadatas=[metadatas[r] for r in rows],
+        )
+
+    db.delete_collection(collection_name)
+    reordered.modify(name=collection_name)
+    print(f"✅ '{collection_name}' reordered")
+
+if __name__ == "__main__":
+    reorder_collection(sys.argv[1] if len(sys.argv) > 1 else "cortex_repo")
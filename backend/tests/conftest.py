@@ -0,0 +1,128 @@
+"""
+Shared test setup. Everything runs offline: data paths point at a temporary directory and
+google-genai talks to a local fake of the Gemini API. This has to happen before `config`
+is imported, since it reads the environment once at import time.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Dimension of the fake API's embeddings
+EMBED_DIM = 8
+
+# Every fake chat answer streams these chunks
+ANSWER_CHUNKS = ["Requests are ", "handled by ", "the router."]
+
+def fake_embedding(text: str) -> list:
+    """Deterministic unit vector for `text`."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(EMBED_DIM)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+class FakeGemini(BaseHTTPRequestHandler):
+    """Answers the few Gemini endpoints the backend uses and counts calls per method."""
+
+    # Keep-alive, so clients really do reuse pooled connections
+    protocol_version = "HTTP/1.1"
+    calls = {}
+    # (status, headers) answers for the next batchEmbedContents requests, ahead of normal
+    # replies; a None status drops the connection partway through the response
+    errors = []
+    # (monotonic time, batch size, status) of every batchEmbedContents request
+    batches = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # models.get, issued by the GoogleGenAI constructor
+        self._send_json({"name": self.path.split("/")[-1], "inputTokenLimit": 32768, "outputTokenLimit": 2048})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        method = self.path.split("?")[0].rsplit(":", 1)[-1]
+        FakeGemini.calls[method] = FakeGemini.calls.get(method, 0) + 1
+
+        if method == "batchEmbedContents":
+            texts = [request["content"]["parts"][0]["text"] for request in body["requests"]]
+            status, headers = FakeGemini.errors.pop(0) if FakeGemini.errors else (200, None)
+            FakeGemini.batches.append((time.monotonic(), len(texts), status))
+            if status is None:
+                self.send_response(200)
+                self.send_header("Content-Length", "1024")
+                self.end_headers()
+                self.wfile.write(b'{"embeddings": [')
+                self.close_connection = True
+                return
+            if status != 200:
+                self._send_json({"error": {"code": status, "message": "fake error"}}, status, headers)
+                return
+            self._send_json({"embeddings": [{"values": fake_embedding(text)} for text in texts]})
+        elif method == "embedContent":
+            self._send_json({"embedding": {"values": fake_embedding(body["content"]["parts"][0]["text"])}})
+        elif method == "streamGenerateContent":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, text in enumerate(ANSWER_CHUNKS):
+                chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+                if i == len(ANSWER_CHUNKS) - 1:
+                    chunk["candidates"][0]["finishReason"] = "STOP"
+                event = f"data: {json.dumps(chunk)}\r\n\r\n".encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        elif method == "generateContent":
+            self._send_json({"candidates": [{
+                "content": {"role": "model", "parts": [{"text": "".join(ANSWER_CHUNKS)}]},
+                "finishReason": "STOP",
+            }]})
+        else:
+            self.send_error(404)
+
+_server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGemini)
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+DATA_ROOT = tempfile.mkdtemp(prefix="cortex-tests-")
+os.environ.update({
+    "CORTEX_DATA_ROOT": DATA_ROOT,
+    "CORTEX_DOTENV_LOADED": "1",
+    "GEMINI_API_KEY": "test-key",
+    "GOOGLE_GEMINI_BASE_URL": f"http://127.0.0.1:{_server.server_address[1]}/",
+})
+
+@pytest.fixture
+def gemini_calls():
+    """Per-method call counts of the fake Gemini API, reset for each test."""
+    FakeGemini.calls.clear()
+    return FakeGemini.calls
+
+@pytest.fixture
+def fake_gemini(gemini_calls):
+    """The fake API's handler class, with scripted errors and recorded batches reset."""
+    FakeGemini.errors.clear()
+    FakeGemini.batches.clear()
+    yield FakeGemini
+    FakeGemini.errors.clear()
@@ -0,0 +1,24 @@
+import os
+
+import chromadb
+
+from chroma_store import collection_files
+
+def test_collection_files_are_the_catalog_and_its_own_segments(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    repo = client.get_or_create_collection("repo")
+    repo.add(ids=["a", "b"], embeddings=[[0.1, 0.2], [0.3, 0.4]])
+    other = client.get_or_create_collection("other")
+    other.add(ids=["a"], embeddings=[[0.5, 0.6]])
+
+    catalog = str(tmp_path / "chroma.sqlite3")
+    repo_files = collection_files(repo, str(tmp_path))
+    other_files = collection_files(other, str(tmp_path))
+
+    assert repo_files[0] == catalog and other_files[0] == catalog
+    assert any(f.endswith("data_level0.bin") for f in repo_files)
+    # Each collection's HNSW files sit in one segment directory that the other never touches
+    repo_dirs = {os.path.dirname(f) for f in repo_files[1:]}
+    other_dirs = {os.path.dirname(f) for f in other_files[1:]}
+    assert len(repo_dirs) == 1 and len(other_dirs) == 1
+    assert repo_dirs != other_dirs
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from ingest import ConcurrentGoogleGenAIEmbedding
+from conftest import fake_embedding
+
+def embedding(**kwargs):
+    return ConcurrentGoogleGenAIEmbedding(**{
+        "model": "text-embedding-004",
+        "api_key": "test-key",
+        "embed_batch_size": 100,
+        "max_batch_size": 100,
+        "min_batch_size": 16,
+        "grow_after": 2,
+        "max_concurrent_batches": 1,
+        "requests_per_minute": 600_000,
+        **kwargs,
+    })
+
+def test_rate_limit_halves_the_batch_honours_retry_after_and_grows_back(fake_gemini):
+    fake_gemini.errors.append((429, {"Retry-After": "0.3"}))
+    texts = [f"chunk {i}" for i in range(1000)]
+    model = embedding()
+
+    vectors = asyncio.run(model.aget_text_embedding_batch(texts))
+
+    assert vectors == [fake_embedding(t) for t in texts]
+    (limited_at, _, _), (retried_at, retry_size, retry_status) = fake_gemini.batches[:2]
+    # The rejected slice is resent whole, after the server's Retry-After rather than the 1s default backoff
+    assert (retry_size, retry_status) == (100, 200)
+    assert 0.3 <= retried_at - limited_at < 1.0
+    sizes = [size for _, size, status in fake_gemini.batches[2:] if status == 200]
+    assert sizes[0] == 50
+    assert max(sizes) > 50
+    assert sum(sizes) == 900
+
+def test_dropped_connections_are_retried(fake_gemini):
+    fake_gemini.errors.append((None, None))
+    texts = ["alpha", "beta"]
+
+    assert asyncio.run(embedding().aget_text_embedding_batch(texts)) == [fake_embedding(t) for t in texts]
+    assert [status for _, _, status in fake_gemini.batches] == [None, 200]
+
+def test_a_failed_batch_stops_its_sibling_workers(fake_gemini):
+    fake_gemini.errors.append((400, None))
+    model = embedding(max_concurrent_batches=4)
+
+    async def run():
+        with pytest.raises(Exception):
+            await model.aget_text_embedding_batch([f"chunk {i}" for i in range(1000)])
+        # Give any surviving worker time to keep sending batches
+        await asyncio.sleep(0.5)
+
+    asyncio.run(run())
+    assert len(fake_gemini.batches) <= 4
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+
+from embed_cache import CachingEmbedding, EmbeddingCache, QueryCache
+
+class CountingEmbedding(MockEmbedding):
+    """MockEmbedding that records every text and query it is asked to embed."""
+
+    texts: list = []
+    queries: list = []
+
+    def _get_text_embeddings(self, texts):
+        self.texts.extend(texts)
+        return super()._get_text_embeddings(texts)
+
+    async def _aget_text_embeddings(self, texts):
+        self.texts.extend(texts)
+        return super()._get_text_embeddings(texts)
+
+    def _get_query_embedding(self, query):
+        self.queries.append(query)
+        return [float(len(self.queries))] * self.embed_dim
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embed_cache.sqlite3")
+
+def caching(cache_path, **kwargs):
+    return CachingEmbedding(CountingEmbedding(embed_dim=4, texts=[], queries=[]), cache_path=cache_path, **kwargs)
+
+def test_async_query_misses_are_persisted_off_the_event_loop(cache_path, monkeypatch):
+    writers = []
+    put_queries = EmbeddingCache.put_queries
+
+    def recording(self, items, model):
+        writers.append(threading.current_thread() is threading.main_thread())
+        put_queries(self, items, model)
+
+    monkeypatch.setattr(EmbeddingCache, "put_queries", recording)
+    model = caching(cache_path)
+    vec = asyncio.run(model.aget_query_embedding("How is the router built?"))
+
+    assert writers == [False]
+    # A fresh instance answers from disk without calling the model
+    reloaded = caching(cache_path)
+    assert asyncio.run(reloaded.aget_query_embedding("how is the  router built?")) == vec
+    assert reloaded.embed_model.queries == []
+
+LICENSE = (
+    "Permission is hereby granted free of charge to any person obtaining a copy of this software "
+    "and associated documentation files to deal in the software without restriction including "
+    "without limitation the rights to use copy modify merge publish distribute sublicense"
+)
+
+def test_async_text_lookups_and_writes_run_off_the_event_loop(cache_path, monkeypatch):
+    on_main = []
+    for name in ("get_many", "put_many", "find_cluster"):
+        method = getattr(EmbeddingCache, name)
+
+        def recording(self, *args, _method=method):
+            on_main.append(threading.current_thread() is threading.main_thread())
+            return _method(self, *args)
+
+        monkeypatch.setattr(EmbeddingCache, name, recording)
+    model = caching(cache_path, semantic_tau=0.7)
+    asyncio.run(model.aget_text_embedding_batch(["alpha", LICENSE]))
+
+    # get_many, find_cluster for each miss, then put_many
+    assert len(on_main) == 4 and not any(on_main)
+
+def test_exact_repeats_are_embedded_once(cache_path):
+    model = caching(cache_path)
+    first = model.get_text_embedding_batch(["alpha", "beta", "alpha"])
+
+    assert model.embed_model.texts == ["alpha", "beta"]
+    assert first[0] == first[2]
+    assert model.get_text_embedding_batch(["beta"]) == [first[1]]
+    assert model.embed_model.texts == ["alpha", "beta"]
+
+def test_near_duplicates_reuse_the_cluster_vector(cache_path):
+    model = caching(cache_path, semantic_tau=0.7)
+    original = model.get_text_embedding(LICENSE)
+    edited = LICENSE.replace("publish", "print")
+
+    assert model.get_text_embedding(edited) == original
+    assert model.embed_model.texts == [LICENSE]
+    # Unrelated text is still embedded
+    model.get_text_embedding("def handler(request): return response")
+    assert len(model.embed_model.texts) == 2
+
+def test_text_without_words_skips_the_semantic_tier(cache_path):
+    model = caching(cache_path, semantic_tau=0.7)
+    separators = ["# ----------------", "/* ==== */", "}}}"]
+    model.get_text_embedding_batch(separators)
+    model.get_text_embedding("==================")
+
+    # Each is embedded instead of reusing one empty-shingle cluster's vector
+    assert model.embed_model.texts == separators + ["=================="]
+
+def test_cache_persists_across_instances(cache_path):
+    first = caching(cache_path, semantic_tau=0.7)
+    vectors = first.get_text_embedding_batch(["alpha", LICENSE])
+    query = first.get_query_embedding("Where are requests routed?")
+
+    second = caching(cache_path, semantic_tau=0.7)
+    assert second.get_text_embedding_batch(["alpha", LICENSE]) == vectors
+    assert second.get_text_embedding(LICENSE.replace("merge", "combine")) == vectors[1]
+    assert second.get_query_embedding("where are requests ROUTED?") == query
+    assert second.embed_model.texts == [] and second.embed_model.queries == []
+
+def test_near_repeat_queries_hit_above_tau(cache_path):
+    model = caching(cache_path, query_tau=0.5)
+    question = "how does the ingest pipeline stream documents from the reader into chroma"
+    vec = model.get_query_embedding(question)
+
+    assert model.get_query_embedding(question + " today") == vec
+    assert model.get_query_embedding("what port does the gateway listen on") != vec
+    assert len(model.embed_model.queries) == 2
+
+def test_query_cache_evicts_least_recent_and_reuses_its_row():
+    cache = QueryCache(maxsize=2)
+    cache.put("first question", [1.0, 0.0])
+    cache.put("second question", [0.0, 1.0])
+    cache.get("first question")
+    cache.put("third question", [0.5, 0.5])
+
+    assert cache.get("second question") is None
+    assert cache.get("second question", tau=0.01) is None
+    assert np.array_equal(cache.get("first question"), [1.0, 0.0])
+    assert np.array_equal(cache.get("third question"), [0.5, 0.5])
+    # The evicted entry's row was reused and its LSH bands dropped
+    assert sorted(cache._rows.values()) == [0, 1]
+    assert all(members <= set(cache._rows) for members in cache._bands.values())
+
+def test_query_cache_returns_copies():
+    cache = QueryCache(maxsize=1)
+    cache.put("only question", [1.0, 2.0])
+    vec = cache.get("only question")
+    cache.put("replacement", [3.0, 4.0])
+
+    assert np.array_equal(vec, [1.0, 2.0])
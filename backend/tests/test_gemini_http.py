@@ -0,0 +1,20 @@
+import asyncio
+
+from gemini_http import pooled_genai_client, shared_http_client
+from conftest import EMBED_DIM
+
+def test_models_with_same_options_share_one_client():
+    assert pooled_genai_client("test-key") is pooled_genai_client("test-key")
+    assert pooled_genai_client("test-key")._api_client._httpx_client is shared_http_client()
+
+def test_pooled_client_survives_successive_event_loops(gemini_calls):
+    client = pooled_genai_client("test-key")
+
+    async def embed():
+        result = await client.aio.models.embed_content(model="text-embedding-004", contents=["hello"])
+        return len(result.embeddings[0].values)
+
+    # Each asyncio.run() closes its loop; the next one must not reuse its connections
+    assert asyncio.run(embed()) == EMBED_DIM
+    assert asyncio.run(embed()) == EMBED_DIM
+    assert gemini_calls["batchEmbedContents"] == 2
@@ -0,0 +1,104 @@
+import asyncio
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from prefetch import PrefetchingRetriever
+
+DEBOUNCE = 0.05
+
+class RecordingRetriever(BaseRetriever):
+    """Returns one node named after the query, after `delay` seconds; records started and cancelled queries."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        super().__init__()
+        self.delay = delay
+        self.fail = fail
+        self.queries = []
+        self.cancelled = []
+
+    def _retrieve(self, query_bundle):
+        return [NodeWithScore(node=TextNode(text=query_bundle.query_str), score=1.0)]
+
+    async def _aretrieve(self, query_bundle):
+        self.queries.append(query_bundle.query_str)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(query_bundle.query_str)
+            raise
+        if self.fail:
+            raise RuntimeError("search failed")
+        return self._retrieve(query_bundle)
+
+def texts(nodes):
+    return [n.node.get_content() for n in nodes]
+
+def test_typing_is_debounced_and_the_sent_question_reuses_the_prefetch():
+    inner = RecordingRetriever()
+
+    async def run():
+        retriever = PrefetchingRetriever(inner, debounce=DEBOUNCE)
+        for draft in ["Where", "Where is", "Where is the router", "Where is the router?"]:
+            retriever.prefetch(draft)
+            await asyncio.sleep(DEBOUNCE / 5)
+        await asyncio.sleep(DEBOUNCE * 2)
+        return await retriever.aretrieve(" Where is the router? ")
+
+    assert texts(asyncio.run(run())) == ["Where is the router?"]
+    # Only the draft typing paused on was searched, and the question itself was not searched again
+    assert inner.queries == ["Where is the router?"]
+
+def test_short_drafts_are_not_prefetched():
+    inner = RecordingRetriever()
+
+    async def run():
+        retriever = PrefetchingRetriever(inner, debounce=DEBOUNCE)
+        retriever.prefetch("why?")
+        await asyncio.sleep(DEBOUNCE * 2)
+        assert inner.queries == []
+        return await retriever.aretrieve("why?")
+
+    assert texts(asyncio.run(run())) == ["why?"]
+
+def test_a_new_draft_cancels_the_running_prefetch():
+    inner = RecordingRetriever(delay=1.0)
+
+    async def run():
+        retriever = PrefetchingRetriever(inner, debounce=DEBOUNCE)
+        retriever.prefetch("How is ingest")
+        await asyncio.sleep(DEBOUNCE * 2)
+        retriever.prefetch("How is ingest parallelised?")
+        await asyncio.sleep(DEBOUNCE * 2)
+
+    asyncio.run(run())
+    assert inner.queries == ["How is ingest", "How is ingest parallelised?"]
+    assert inner.cancelled[0] == "How is ingest"
+
+def test_a_different_question_cancels_the_prefetch_and_retrieves_afresh():
+    inner = RecordingRetriever(delay=0.2)
+
+    async def run():
+        retriever = PrefetchingRetriever(inner, debounce=DEBOUNCE)
+        retriever.prefetch("How are embeddings cached?")
+        await asyncio.sleep(DEBOUNCE * 2)
+        # The user edits and sends before the next debounce fires
+        retriever.prefetch("How are queries cached?")
+        return await retriever.aretrieve("How are queries cached?")
+
+    assert texts(asyncio.run(run())) == ["How are queries cached?"]
+    assert inner.queries == ["How are embeddings cached?", "How are queries cached?"]
+    assert inner.cancelled == ["How are embeddings cached?"]
+
+def test_a_failed_prefetch_falls_back_to_retrieving_now():
+    inner = RecordingRetriever(fail=True)
+
+    async def run():
+        retriever = PrefetchingRetriever(inner, debounce=DEBOUNCE)
+        retriever.prefetch("What does upsert do?")
+        await asyncio.sleep(DEBOUNCE * 2)
+        inner.fail = False
+        return await retriever.aretrieve("What does upsert do?")
+
+    assert texts(asyncio.run(run())) == ["What does upsert do?"]
+    assert inner.queries == ["What does upsert do?", "What does upsert do?"]
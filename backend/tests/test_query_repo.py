@@ -0,0 +1,47 @@
+import chromadb
+import pytest
+
+from config import CHROMA_DB_PATH
+from conftest import ANSWER_CHUNKS, fake_embedding
+
+@pytest.fixture
+def query_repo(monkeypatch):
+    collection = chromadb.PersistentClient(path=CHROMA_DB_PATH).get_or_create_collection(
+        "cortex_repo", metadata={"hnsw:space": "cosine"}
+    )
+    text = "def handle(request): return router.dispatch(request)"
+    collection.upsert(ids=["n1"], documents=[text], embeddings=[fake_embedding(text)], metadatas=[{"file_path": "app.py"}])
+
+    import query_repo
+    # Every session asks the API afresh
+    monkeypatch.setattr(query_repo, "RESPONSE_CACHE", False)
+    return query_repo
+
+def scripted_input(monkeypatch, query_repo, lines):
+    async def read(prompt):
+        if not lines:
+            raise EOFError
+        return lines.pop(0)
+    monkeypatch.setattr(query_repo, "input_reader", lambda on_change: read)
+
+def test_chat_can_be_restarted_in_the_same_process(query_repo, monkeypatch, capfd, gemini_calls):
+    # Each start_chat() runs its own event loop over the same cached engine and pooled client
+    scripted_input(monkeypatch, query_repo, ["How are requests handled?"])
+    query_repo.start_chat()
+    scripted_input(monkeypatch, query_repo, ["Where is the router?"])
+    query_repo.start_chat()
+
+    out = capfd.readouterr().out
+    assert "Error" not in out
+    assert out.count("".join(ANSWER_CHUNKS)) == 2
+    assert gemini_calls["streamGenerateContent"] == 2
+
+def test_token_writer_keeps_order_and_non_ascii(query_repo, capfd):
+    print("AI: ", end="", flush=True)
+    writer = query_repo.TokenWriter(min_chars=4)
+    for token in ["Ça ", "marche ", "✅", "\n", "fin"]:
+        writer.write(token)
+    writer.close()
+    print(" --")
+
+    assert capfd.readouterr().out == "AI: Ça marche ✅\nfin --\n"
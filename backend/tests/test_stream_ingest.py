@@ -0,0 +1,75 @@
+import asyncio
+
+import chromadb
+import numpy as np
+import pytest
+from llama_index.core import Settings, SimpleDirectoryReader
+from llama_index.core.embeddings import MockEmbedding
+
+import ingest
+from embed_cache import CachingEmbedding
+
+class CountingEmbedding(MockEmbedding):
+    """MockEmbedding that records every text it is asked to embed."""
+
+    texts: list = []
+
+    async def _aget_text_embeddings(self, texts):
+        self.texts.extend(texts)
+        return await super()._aget_text_embeddings(texts)
+
+@pytest.fixture
+def embed_model(monkeypatch, tmp_path):
+    """The counting model, behind the content-hash cache as in a real ingest."""
+    model = CountingEmbedding(embed_dim=8, texts=[])
+    caching = CachingEmbedding(model, cache_path=str(tmp_path / "embed_cache.sqlite3"))
+    monkeypatch.setattr(Settings, "embed_model", caching)
+    return model
+
+@pytest.fixture
+def collection(tmp_path):
+    db = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    return db.create_collection("test_ingest", metadata={"hnsw:space": "cosine"})
+
+def write_files(root, contents):
+    paths = []
+    for i, text in enumerate(contents):
+        path = root / f"file_{i:04d}.md"
+        path.write_text(text)
+        paths.append(str(path))
+    return SimpleDirectoryReader(input_files=paths)
+
+def test_duplicate_chunks_are_embedded_once(tmp_path, embed_model, collection):
+    contents = [f"Section {i % 10}: the ingest pipeline streams documents." for i in range(30)]
+    asyncio.run(ingest.stream_ingest(write_files(tmp_path, contents), collection))
+
+    assert collection.count() == 30
+    assert sorted(embed_model.texts) == sorted(set(embed_model.texts))
+    assert len(embed_model.texts) == 10
+
+    # Stored vectors are unit length (the collection uses cosine distance)
+    stored = np.asarray(collection.get(include=["embeddings"])["embeddings"])
+    assert np.allclose(np.linalg.norm(stored, axis=1), 1.0, atol=1e-5)
+
+def test_identical_chunks_beyond_upsert_batch_size(tmp_path, embed_model, collection, monkeypatch):
+    # Every chunk repeats the first, so one embed batch holds more nodes than an upsert takes
+    monkeypatch.setattr(ingest, "UPSERT_BATCH_SIZE", 50)
+    asyncio.run(ingest.stream_ingest(write_files(tmp_path, ["The same license header."] * 80), collection))
+
+    assert collection.count() == 80
+    assert len(embed_model.texts) == 1
+
+def test_distinct_chunks_beyond_upsert_batch_size(tmp_path, embed_model, collection, monkeypatch):
+    monkeypatch.setattr(ingest, "UPSERT_BATCH_SIZE", 50)
+    contents = [f"Module {i} exports helper_{i}." for i in range(120)]
+    asyncio.run(ingest.stream_ingest(write_files(tmp_path, contents), collection))
+
+    stored = collection.get()["documents"]
+    assert sorted(stored) == sorted(contents)
+
+def test_large_repos_chunk_in_a_process_pool(tmp_path, embed_model, collection, monkeypatch):
+    monkeypatch.setattr(ingest, "PARALLEL_CHUNK_MIN_FILES", 20)
+    contents = [f"Handler {i} validates its request." for i in range(40)]
+    asyncio.run(ingest.stream_ingest(write_files(tmp_path, contents), collection))
+
+    assert sorted(collection.get()["documents"]) == sorted(contents)